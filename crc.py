@@ -0,0 +1,50 @@
+from array import array
+
+try:  # optional, C implementation of CRC-16/MODBUS
+    import crcmod.predefined
+    _modbus_crc = crcmod.predefined.mkPredefinedCrcFun('modbus')
+except ImportError:
+    _modbus_crc = None
+
+# Modbus CRC-16 (reflected polynomial 0xA001), shared by the Modbus sensor scripts
+def _crc_table():
+    table = array('H')
+    for byte in range(256):
+        crc = byte
+        for i in range(8):
+            if ((crc & 1) != 0):
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+# CRC of every possible byte, computed once so each data byte costs one lookup instead of 8 shifts
+_CRC_TABLE = _crc_table()
+
+def modbus_crc_16(data, endian="big"):
+    """Checksum based on Modbus CRC-16 coding.
+
+    Parameters
+    ----------
+    data : bytearray
+        data to calculate checksum
+    endian : str, optional
+        system endian, by default "big"
+
+    Returns
+    -------
+    first, second : bytes, bytes
+        checksum data in two bytes
+    """    
+    if _modbus_crc is not None:
+        crc = _modbus_crc(bytes(data))
+    else:
+        crc = 0xFFFF
+        for pos in data:
+            crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ pos) & 0xFF]
+    if endian == "little":
+        return crc >> 8, crc & 0xff
+    elif endian == "big":
+        return crc & 0xff, crc >> 8
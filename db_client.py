@@ -0,0 +1,19 @@
+import threading
+from google.cloud import firestore
+from google.oauth2 import service_account
+
+# Credentials JSON key file
+cred = service_account.Credentials.from_service_account_file('db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json')
+
+# Database init, shared by all modules
+db = firestore.Client(credentials=cred)
+
+# Open the gRPC channel in the background so the TLS handshake overlaps with start-up
+# instead of delaying the first write
+def _warm():
+    try:
+        list(db.collection('_warmup').limit(1).stream())
+    except Exception:
+        pass
+
+threading.Thread(target=_warm, daemon=True).start()
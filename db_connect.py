@@ -1,75 +1,156 @@
+import sys
 import pytz
+import atexit
+import threading
+from contextlib import contextmanager
 from google.cloud import firestore
-from google.oauth2 import service_account
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from db_client import db
 
-# Credentials JSON key file
-cred = service_account.Credentials.from_service_account_file('db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json')
+# Pending writes are committed together once BATCH_SIZE records are queued,
+# FLUSH_INTERVAL seconds after the first queued record, or at exit
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5
+_MAX_BATCH_WRITES = 500  # Firestore limit of writes per batch
 
-db = firestore.Client(credentials=cred)
+_pending = []
+_next_record_number = {}
+_flush_timer = None
+_held = 0  # open batched() blocks, records are only committed once the last one exits
+_lock = threading.Lock()
 
 ## Sensor Type > Sensor ID > Data ==FIXED== > num_of_records
 
 # Read from Firebase
-def read_all_from_collection(collection_name, sensor_id):
-    if collection_name == 'Temperature':
-        sensor_name = 'temp'
-    elif collection_name == 'Soil':
-        sensor_name = 'soil'
-    elif collection_name == 'Lighting':
-        sensor_name = 'light'
-    elif collection_name is None:
-        raise ValueError("Missing collection name!")        
+_SENSOR_PREFIX = {'Temperature': 'temp', 'Soil': 'soil', 'Lighting': 'light'}
+
+_FIELDS = [('temperature', "Temperature => {} \u00B0C"),
+           ('humidity', "Humidity => {}%"),
+           ('moisture', "Soil Moisture => {}%"),
+           ('EC', "Electric Conductivity => {} us/cm"),
+           ('pH', "Soil pH => {}"),
+           ('nitrogen', "Nitrogen => {} mg/kg"),
+           ('phosphorus', "Phosphorus => {} mg/kg"),
+           ('potassium', "Potassium => {} mg/kg")]
+
+TZ = pytz.timezone('Asia/Kuala_Lumpur')
+DATE_FMT = '%Y-%m-%d %I:%M:%S %p %Z'
+
+_FIELDS_USED = ['date_time'] + [key for key, _ in _FIELDS]
+
+# Records are listed newest first; `since` bounds the scan to records at or after a datetime,
+# `limit` to the latest number of records
+def read_all_from_collection(collection_name, sensor_id, since=None, limit=None):
+    if collection_name is None:
+        raise ValueError("Missing collection name!")
+    sensor_name = _SENSOR_PREFIX[collection_name]
     
-    docs = db.collection(collection_name).document(sensor_name + str(sensor_id)).collection('Data').stream()
+    query = db.collection(collection_name).document(sensor_name + str(sensor_id)).collection('Data').select(_FIELDS_USED)
+    if since is not None:
+        query = query.where('date_time', '>=', since)
+    query = query.order_by('date_time', direction=firestore.Query.DESCENDING)
+    if limit is not None:
+        query = query.limit(limit)
+    docs = query.stream()
 
     for doc in docs:
         doc_data = doc.to_dict()
-        print(f"Date => {doc_data['date_time'].astimezone(pytz.timezone('Asia/Kuala_Lumpur')).strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
-        if 'temperature' in doc_data:
-            print(f"Temperature => {doc_data['temperature']} \u00B0C")
-        if 'humidity' in doc_data:
-            print(f"Humidity => {doc_data['humidity']}%")
-        if 'moisture' in doc_data:
-            print(f"Soil Moisture => {doc_data['moisture']}%")
-        if 'EC' in doc_data:
-            print(f"Electric Conductivity => {doc_data['EC']} us/cm")
-        if 'pH' in doc_data:
-            print(f"Soil pH => {doc_data['pH']}")
-        if 'nitrogen' in doc_data:
-            print(f"Nitrogen => {doc_data['nitrogen']} mg/kg")
-        if 'phosphorus' in doc_data:
-            print(f"Phosphorus => {doc_data['phosphorus']} mg/kg")
-        if 'potassium' in doc_data:
-            print(f"Potassium => {doc_data['potassium']} mg/kg")
+        parts = [f"Date => {doc_data['date_time'].astimezone(TZ).strftime(DATE_FMT)}"]
+        parts.extend(fmt.format(doc_data[key]) for key, fmt in _FIELDS if key in doc_data)
+        sys.stdout.write("\n".join(parts) + "\n")
 
 # Write to Firebase
-def add_new_record(sensor_name, sensor_id, data):
+def _latest_record_number(data_ref):
+    # Highest numeric record id; document ids are listed without reading record data,
+    # non-numeric ids are skipped. Not ordered by date_time, the Pi's clock may jump
+    return max((int(doc_ref.id) for doc_ref in data_ref.list_documents() if doc_ref.id.isdigit()), default=0)
+
+def flush():
+    global _flush_timer
+    with _lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        to_commit = _pending[:]
+        del _pending[:]
+
+    for start in range(0, len(to_commit), _MAX_BATCH_WRITES):
+        batch = db.batch()
+        for doc_ref, doc in to_commit[start:start + _MAX_BATCH_WRITES]:
+            batch.set(doc_ref, doc)
+        try:
+            batch.commit()
+        except Exception as e:
+            # Uncommitted records go back in front of the queue, committed again with the next flush
+            with _lock:
+                _pending[:0] = to_commit[start:]
+            print(f"An error occurred: {e}")
+            return
+
+atexit.register(flush)
+
+# Queue every record written inside the block and commit them together when it exits,
+# e.g. once per polling tick across all sensors
+@contextmanager
+def batched():
+    global _held
+    with _lock:
+        _held += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _held -= 1
+            release = _held == 0
+        if release:
+            flush()
+
+def _queue_records(sensor_name, sensor_id, records):
+    global _flush_timer
     active_ref = db.collection(sensor_name).document(sensor_name.lower() + '_' + str(sensor_id))
     data_ref = active_ref.collection("Data")
 
-    active_ref.set({
-        'active': True,
-        })
+    # Only the first record of a sensor queries the latest record number, later ones count on from it.
+    # The query runs outside the lock, a concurrent first writer of the same sensor keeps its number
+    with _lock:
+        known = active_ref.path in _next_record_number
+    if not known:
+        first_number = _latest_record_number(data_ref) + 1
 
-    docs = data_ref.stream()
+    with _lock:
+        if not known:
+            _next_record_number.setdefault(active_ref.path, first_number)
 
-    latest_record_number = 0
-    for doc in docs:
-        try:
-            record_number = int(doc.id)
-            if record_number > latest_record_number:
-                latest_record_number = record_number
-        except ValueError:
-            pass
-
-    new_record_number = latest_record_number + 1
-
-    new_doc_ref = data_ref.document(str(new_record_number))
-    new_doc_ref.set({
-        'date_time': firestore.SERVER_TIMESTAMP,
-        **data,
-    })
+        _pending.append((active_ref, {'active': True}))
+        for data in records:
+            record_number = _next_record_number[active_ref.path]
+            _next_record_number[active_ref.path] = record_number + 1
+            _pending.append((data_ref.document(str(record_number)), {
+                'date_time': datetime.now(timezone.utc),
+                **data,
+            }))
+
+        if _held:
+            return
+        full = len(_pending) >= BATCH_SIZE
+        if not full and _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_INTERVAL, flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+    if full:
+        flush()
+
+def add_new_record(sensor_name, sensor_id, data):
+    _queue_records(sensor_name, sensor_id, [data])
+
+# Write multiple records of one sensor in a single commit
+def add_new_records(sensor_name, sensor_id, records):
+    _queue_records(sensor_name, sensor_id, records)
+    with _lock:
+        held = _held
+    if not held:
+        flush()
 
 def get_data_retrieval_time():
     docs = db.collection('Global').document('1').get()
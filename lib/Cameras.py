@@ -6,18 +6,42 @@
             RaspberryPiCamera, MultiRaspberryPiCamera, MultiRaspberryPiCamera_cv will return None
 """
 import os
+import io
 import sys
 import traceback
 import time
+import queue
+import asyncio
+import collections
+import threading
 import cv2
 import numpy as np
 import PySide2.QtCore as qtcore
 
+try:  ##optional, CUDA runtime for publishing frames to GPU consumers
+    from cupy.cuda import runtime as _cuda_rt
+except Exception:
+    _cuda_rt = None
+
+try:  ##optional, libjpeg-turbo SIMD encoder
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _tj = TurboJPEG()
+except Exception:
+    _tj = None
+
+_PNG_PARAMS = (cv2.IMWRITE_PNG_COMPRESSION, 1)  ##fast deflate, default level 3
+_JPEG_PARAMS = {}  ##quality -> cv2.imencode params, see :meth: `Camera._encode`
+
 import platform
 if platform.machine() in ['armv7l']:
     import RPi.GPIO as gp
     from picamera.array import PiRGBArray
     from picamera import PiCamera
+    try:  ##direct I2C access, avoids forking i2cset per channel switch
+        import smbus2
+        _BUS = smbus2.SMBus(1)
+    except Exception:
+        _BUS = None
     
 from hortilite.HikRobotCameras import HikRobotCamera, hik_MV_FRAME_OUT_INFO_EX
 
@@ -25,6 +49,49 @@ from hortilite.HikRobotCameras import HikRobotCamera, hik_MV_FRAME_OUT_INFO_EX
 ##CameraLoopWorker - moved to PySideThreads
 from hortilite.GUI.PySideThreads import LoopWorker as CameraLoopWorker, Worker as CameraWorker
 
+class CudaFrame(object):
+    """Frame in page-locked host memory mapped into device address space.
+        Exposes ``__cuda_array_interface__`` so CuPy/torch/numba can wrap it without copy
+    """
+    _registered = {}  ##host pointer -> device pointer, registered once per buffer until :meth: `unregister`
+    
+    def __init__(self, frame):
+        """Register `frame` buffer with CUDA (cudaHostRegister, mapped) if not yet registered
+
+        Parameters
+        ----------
+        frame : numpy.ndarray
+            C-contiguous, long-lived frame buffer, must stay registered while this object is used
+        """
+        if _cuda_rt is None:
+            raise Exception("CUDA frames require cupy")
+        host_ptr = frame.ctypes.data
+        dev_ptr = CudaFrame._registered.get(host_ptr)
+        if dev_ptr is None:
+            _cuda_rt.hostRegister(host_ptr, frame.nbytes, 2)  ##cudaHostRegisterMapped
+            dev_ptr = _cuda_rt.hostGetDevicePointer(host_ptr, 0)
+            CudaFrame._registered[host_ptr] = dev_ptr
+        self.frame = frame
+        self.__cuda_array_interface__ = {
+            "shape": frame.shape,
+            "typestr": frame.dtype.str,
+            "data": (dev_ptr, False),
+            "version": 2,
+        }
+    
+    @classmethod
+    def unregister(cls, frames):
+        """Unpin frame buffers registered by CudaFrame, before they are freed or reused for other memory
+
+        Parameters
+        ----------
+        frames : list
+            numpy.ndarray buffers, unregistered ones are skipped
+        """
+        for frame in frames:
+            if cls._registered.pop(frame.ctypes.data, None) is not None:
+                _cuda_rt.hostUnregister(frame.ctypes.data)
+
 class Camera(object):
     """ Base class for cameras to standardize common calls using various camera
     
@@ -41,7 +108,7 @@ class Camera(object):
     """
     def __init__(self, dev_addr: int=None, 
                  img_width: int=None, img_height: int=None,
-                 metadata: dict=None, verbose: bool=False, testing: bool=False, *args, **kwargs):
+                 metadata: dict=None, verbose: bool=False, testing: bool=False, core_id: int=None, *args, **kwargs):
         """Instantiate Camera
 
         Notes
@@ -62,9 +129,12 @@ class Camera(object):
             Execution verbosity, by default False
         testing : bool, optional
             Whether to run camara object under testing mode, by default False
+        core_id : int, optional
+            CPU core to pin background acquisition thread to, by default None (not pinned), see :meth: `_pin_thread`
         """
         ##passed
         self._dev_addr = dev_addr
+        self._core_id = core_id
         self._img_width = img_width
         self._img_height = img_height
         self._metadata = metadata
@@ -72,11 +142,28 @@ class Camera(object):
         self._testing = testing
         
         ##internal
+        self._set_geometry()
         self.cam = None
         self.cam_stream = None  ##a stream object (PiRGBArray) to store captured frames
         self._connected = False
         self._streaming = False  ##remain False
         
+        ##background acquisition (buffer pool), see :meth: `_start_acquisition`
+        self._bufs = None  ##preallocated frame buffers, None if disabled
+        self._free = collections.deque()  ##indexes of buffers not queued, held by consumer or being filled
+        self._held = None  ##index of buffer handed out by get_latest, freed on next call
+        self._buf_free = threading.Condition()  ##notified when a buffer returns to `_free`
+        self._q = queue.Queue(maxsize=2)  ##indexes of filled buffers, oldest dropped when full
+        self._dropped_acq = 0  ##frames dropped by acquisition thread (queue full), only written by that thread
+        self._dropped = 0  ##stale frames skipped by get_latest, only written by the consumer
+        self._acq_stop = threading.Event()
+        self._acq_thread = None
+        
+        ##metrics, see :meth: `stats`
+        self._n_captured = 0  ##frames returned by capture_one
+        self._n_failed = 0  ##captures returning None
+        self._capture_ms_ema = 0.0  ##moving average of capture_one duration
+        
         self._initialize()
     
     ################
@@ -102,6 +189,23 @@ class Camera(object):
         """
         return self._img_width, self._img_height
     
+    def _set_geometry(self):
+        """Compute frame geometry once from camera resolution:
+            `_shape` (height, width, 3), `_nbytes` per BGR frame and padded `_w_aligned`, `_h_aligned`
+            (width multiple of 32, height multiple of 16 as required by Raspberry Pi ISP for unencoded formats).
+            All None/0 if image size is unknown.
+        """
+        if self._img_width is None or self._img_height is None:
+            self._shape = None
+            self._nbytes = 0
+            self._w_aligned = None
+            self._h_aligned = None
+            return
+        self._shape = (self._img_height, self._img_width, 3)
+        self._nbytes = self._img_height * self._img_width * 3
+        self._w_aligned = (self._img_width + 31) & ~31
+        self._h_aligned = (self._img_height + 15) & ~15
+    
     def get_metadata(self):
         """Returns camera metadata
 
@@ -113,38 +217,258 @@ class Camera(object):
         return self._metadata
     
     @staticmethod
-    def _encode_png(imageData):
-        """Encode image data from 3-D BGR numpy array to PNG format in bytes
+    def _encode(imageData, fmt="jpg", quality=85, view=False):
+        """Encode image data from 3-D BGR numpy array to JPEG or PNG format in bytes
 
         Notes
         -----
-            Display image as QtWidget.Label requries encoding to PNG format
-            Conversion using cv.imencode function `[ref]`_
+            Display image as QtWidget.Label requries encoding, QPixmap detects the format from data
+            JPEG is encoded with libjpeg-turbo (PyTurboJPEG) if available, else cv.imencode function `[ref]`_
+            PNG (lossless, slower) is kept for saves
             
 
         Parameters
         ----------
         imageData : 3-D BGR numpy Array
             image data stored in numpy array
+        fmt : str, optional
+            Encoding format, "jpg" or "png", by default "jpg"
+        quality : int, optional
+            JPEG quality (0-100), by default 85
+        view : bool, optional
+            Whether to return a memoryview over OpenCV's output buffer instead of copying it to bytes, by default False
+            QPixmap.loadFromData accepts either
 
         Returns
         -------
-        bytes or None
+        bytes or memoryview or None
             encoded image if successful else None
             
         .. _[ref]:
             https://stackoverflow.com/questions/50630045/how-to-turn-numpy-array-image-to-bytes
-        """        
-        ##encode BGR numpy array to png bytes
-        ret, encoded = cv2.imencode(".png", imageData)  
+        """
+        if fmt in ["jpg", "jpeg"]:
+            if not _tj is None:
+                return _tj.encode(imageData, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)  ##4:2:0 as cv.imencode
+            params = _JPEG_PARAMS.get(quality)
+            if params is None:
+                params = _JPEG_PARAMS[quality] = (cv2.IMWRITE_JPEG_QUALITY, quality)
+            ret, encoded = cv2.imencode(".jpg", imageData, params)
+        elif fmt == "png":
+            ret, encoded = cv2.imencode(".png", imageData, _PNG_PARAMS)
+        else:
+            ##encode BGR numpy array to bytes
+            ret, encoded = cv2.imencode(".{}".format(fmt), imageData)
         if ret:
-            return encoded.tobytes()  ##png_encoded bytes
+            return encoded.data if view else encoded.tobytes()  ##encoded bytes
         else:
             return None
     
+    @staticmethod
+    def _encode_png(imageData, view=False):
+        """Encode image data from 3-D BGR numpy array to PNG format in bytes. See :meth: `_encode`
+            Pass ``view=True`` for a memoryview over OpenCV's output buffer instead (no copy, not bytes)
+        """
+        return Camera._encode(imageData, fmt="png", view=view)
+    
+    def _pool_size(self):
+        """Returns number of frame buffers needed so acquisition never waits for the consumer:
+            one being filled, one held by consumer and one per queue entry
+        """
+        return self._q.maxsize + 2
+    
+    def _alloc_double_buffer(self):
+        """Allocate frame buffers of camera resolution for background acquisition, see :meth: `_pool_size`.
+            Does nothing if image size is unknown.
+        """
+        if self._shape is None:
+            return
+        self._bufs = [np.empty(self._shape, np.uint8) for i in range(self._pool_size())]
+    
+    def _start_acquisition(self):
+        """Start background thread acquiring frames into free buffers while
+            consumer works on the latest one. Does nothing if buffers are not allocated.
+        """
+        if self._bufs is None:
+            return
+        if not self._acq_thread is None:
+            if self._acq_thread.is_alive():  ##running, or previous thread still inside a capture
+                return
+            self._acq_thread = None
+        self._acq_stop.clear()
+        self._drain()
+        with self._buf_free:
+            self._free = collections.deque(range(len(self._bufs)))  ##all buffers free
+            self._held = None
+        self._acq_thread = threading.Thread(target=self._acquire_loop, daemon=True)
+        self._acq_thread.start()
+    
+    def _stop_acquisition(self, timeout=2):
+        """Stop background acquisition thread
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Duration in seconds to wait for thread to finish, by default 2
+
+        Returns
+        -------
+        bool
+            True if no acquisition thread is running, False if it is still inside a capture after `timeout`
+        """
+        if self._acq_thread is None:
+            return True
+        self._acq_stop.set()
+        self._acq_thread.join(timeout)
+        if self._acq_thread.is_alive():  ##thread is kept, it exits after its current capture
+            if self._verbose:
+                print("Acquisition thread did not stop within", timeout)
+            return False
+        self._acq_thread = None
+        return True
+    
+    def _pin_thread(self, core_id):
+        """Pin calling thread to `core_id` to reduce capture jitter (Linux only)
+
+        Parameters
+        ----------
+        core_id : int
+            CPU core
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            os.sched_setaffinity(0, {core_id % os.cpu_count()})  ##pid 0 --> calling thread
+        except (PermissionError, OSError) as e:
+            if self._verbose:
+                print("Thread pinning not applied", e)
+    
+    def _take_free(self):
+        """Wait for a buffer no one is reading
+
+        Returns
+        -------
+        int or None
+            Buffer index, None if acquisition is stopped meanwhile
+        """
+        with self._buf_free:
+            while not self._free:
+                if self._acq_stop.is_set():
+                    return None
+                self._buf_free.wait(0.1)
+            return self._free.popleft()
+    
+    def _free_buf(self, idx):
+        """Return buffer `idx` to the free list
+        """
+        with self._buf_free:
+            self._free.append(idx)
+            self._buf_free.notify()
+    
+    def _acquire_loop(self):
+        """Background acquisition loop. Fills a free buffer, then queues its index for the consumer.
+            Buffer handed out by :meth: `get_latest` is not refilled until the consumer asks for the next frame.
+        """
+        if not self._core_id is None:
+            self._pin_thread(self._core_id)
+        while not self._acq_stop.is_set():
+            widx = self._take_free()
+            if widx is None:
+                break
+            try:
+                ok = self._acquire_into(self._bufs[widx])
+            except Exception as e:
+                if self._verbose:
+                    print("Error during acquisition", e)
+                ok = False
+            if not ok:
+                self._free_buf(widx)
+                self._acq_stop.wait(0.01)  ##avoid spinning on a broken stream
+                continue
+            self._publish(widx)
+    
+    def _publish(self, idx):
+        """Hand filled buffer to consumer. If consumer is behind, oldest queued frame is dropped
+            and its buffer freed, so latency stays bounded at one frame period.
+
+        Parameters
+        ----------
+        idx : int
+            Index of buffer to be consumed
+        """
+        try:
+            self._q.put_nowait(idx)
+        except queue.Full:
+            try:
+                self._free_buf(self._q.get_nowait())
+            except queue.Empty:  ##consumer took it meanwhile
+                pass
+            self._dropped_acq += 1
+            self._q.put_nowait(idx)  ##single producer, slot freed above
+    
+    def _drain(self):
+        """Discard all queued frames, their buffers are not returned to the free list
+
+        Returns
+        -------
+        int
+            Number of frames discarded
+        """
+        n = 0
+        while True:
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                return n
+            n += 1
+    
+    def get_latest(self, timeout=None):
+        """Wait for a frame from background acquisition and return the newest one,
+            older queued frames are counted as dropped
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Duration in seconds to wait for a frame, by default None (wait forever)
+
+        Returns
+        -------
+        3-D BGR numpy Array or None
+            Latest frame, valid until the next call (its buffer is only refilled after that), None on timeout
+        """
+        if not self._held is None:  ##consumer is done with the previous frame
+            self._free_buf(self._held)
+            self._held = None
+        try:
+            latest = self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                newer = self._q.get_nowait()
+            except queue.Empty:
+                break
+            self._free_buf(latest)
+            latest = newer
+            self._dropped += 1
+        self._held = latest
+        return self._bufs[latest]
+    
+    def get_dropped(self):
+        """Returns number of frames dropped before reaching consumer
+
+        Returns
+        -------
+        int
+            Number of dropped frames
+        """
+        return self._dropped_acq + self._dropped
+    
     ###########################
     # for overriding
     ###########################
+    stats_interval = 0  ##print :meth: `stats` every N captures when verbose, 0 to disable
+    
     def __repr__(self):
         return "Camera object addr: {}".format(self._dev_addr)
     
@@ -173,6 +497,21 @@ class Camera(object):
         """
         pass
     
+    def _acquire_into(self, buf):
+        """Capture one frame into `buf` for background acquisition. For overriding in child.
+
+        Parameters
+        ----------
+        buf : 3-D numpy Array
+            Preallocated frame buffer
+
+        Returns
+        -------
+        bool
+            True if `buf` is filled with a new frame, else False
+        """
+        return False
+    
     def _capture_one(self, encode=False):
         """Capture one frame from camera stream. ##commonly RGB/BGR 3-channel 8-bit image
         For overriding in child.
@@ -240,8 +579,199 @@ class Camera(object):
     
     def capture_one(self, encode=False):
         """Capture one frame from camera stream. See :meth: `_capture_one`
+            Capture duration and count are recorded, see :meth: `stats`
+        """
+        t0 = time.perf_counter()
+        frame = self._capture_one(encode=encode)
+        dt = (time.perf_counter() - t0) * 1000
+        if frame is None:
+            self._n_failed += 1
+            return None
+        self._capture_ms_ema = 0.9*self._capture_ms_ema + 0.1*dt if self._n_captured else dt
+        self._n_captured += 1
+        if self._verbose and self.stats_interval and self._n_captured % self.stats_interval == 0:
+            print(self.__repr__(), self.stats())
+        return frame
+    
+    def stats(self):
+        """Returns capture metrics
+
+        Returns
+        -------
+        dict
+            captured: frames returned by capture_one,
+            failed: captures returning no frame,
+            dropped: frames dropped before reaching consumer,
+            queue_depth: frames waiting in background acquisition queue,
+            capture_ms: moving average of capture duration in milliseconds
+        """
+        return {"captured": self._n_captured,
+                "failed": self._n_failed,
+                "dropped": self.get_dropped(),
+                "queue_depth": self._q.qsize(),
+                "capture_ms": self._capture_ms_ema}
+    
+    def capture_view(self):
+        """Capture one frame as memoryview, e.g. for ``QImage`` without copy. See :meth: `capture_one`
+            With background acquisition (`double_buffer`)
+            the view is only valid until the buffer is refilled by a following capture.
+
+        Returns
+        -------
+        memoryview or None
+            View of BGR frame
+        """
+        frame = self.capture_one(encode=False)
+        if frame is None:
+            return None
+        return memoryview(frame)
+    
+    def _preallocated_bufs(self):
+        """Returns preallocated frame buffers of this camera (background acquisition pool)
+        """
+        return list(self._bufs or [])
+    
+    def capture_cuda(self):
+        """Capture one frame for GPU consumers. Same validity contract as :meth: `capture_view`.
+            Frames must come from preallocated buffers (`double_buffer`),
+            each buffer is pinned once (cudaHostRegister) and stays pinned until :meth: `release_cuda`
+
+        Returns
+        -------
+        CudaFrame or None
+            Object exposing ``__cuda_array_interface__``
+
+        Raises
+        ------
+        Exception
+            When captured frame is not one of the preallocated buffers; pinning a fresh array per capture would leak
+        """
+        frame = self.capture_one(encode=False)
+        if frame is None:
+            return None
+        if not any(frame is buf for buf in self._preallocated_bufs()) or not frame.flags.c_contiguous:
+            raise Exception("CUDA frames require preallocated frame buffers")
+        return CudaFrame(frame)
+    
+    def release_cuda(self):
+        """Unpin frame buffers registered by :meth: `capture_cuda`. CudaFrames taken before are invalid afterwards
         """
-        return self._capture_one(encode=encode)
+        if not _cuda_rt is None:
+            CudaFrame.unregister(self._preallocated_bufs())
+    
+    async def capture_loop(self, out_q: asyncio.Queue, encode=False, interval=0):
+        """Capture frames while camera is connected and put them to `out_q`.
+            Blocking capture runs in the event loop's default executor so cameras share one event loop,
+            e.g. ``asyncio.create_task(cam.capture_loop(q))`` per camera
+
+        Parameters
+        ----------
+        out_q : asyncio.Queue
+            Queue receiving captured frames
+        encode : bool, optional
+            Whether to encode image, by default False
+        interval : float, optional
+            Duration in seconds to wait in between captures, by default 0
+            After a failed capture (e.g. not streaming) at least 0.01s is waited, avoiding a busy loop
+        """
+        loop = asyncio.get_running_loop()
+        while self._connected:
+            frame = await loop.run_in_executor(None, self.capture_one, encode)
+            if frame is None:
+                await asyncio.sleep(max(interval, 0.01))  ##avoid spinning on a broken stream
+                continue
+            await out_q.put(frame)
+            await asyncio.sleep(interval)  ##yield to other cameras
+
+class LatestFrame(object):
+    """Background thread pulling frames from a streaming camera at its native rate,
+        keeping only the newest one (``collections.deque(maxlen=1)``) so consumers never read stale buffered frames.
+        Meant for consumers reading at a high rate (e.g. live view); for occasional captures call
+        :meth: `Camera.capture_one` directly instead of keeping the camera and a core busy in between
+    
+    Notes
+    -----
+        Frames in the camera's preallocated buffers (`double_buffer`) are copied,
+        so a returned frame is not overwritten by later captures.
+    """
+    def __init__(self, camera, encode=False):
+        """Start pulling frames from `camera`
+
+        Parameters
+        ----------
+        camera : Camera
+            Connected, streaming camera
+        encode : bool, optional
+            Whether to keep encoded frames, by default False
+        """
+        self._camera = camera
+        self._encode = encode
+        self.q = collections.deque(maxlen=1)
+        self._seq = 0  ##number of frames received
+        self._read_seq = 0  ##number of the frame last returned by :meth: `latest`
+        self.error = None  ##exception of last failed capture, cleared by the next frame
+        self._cond = threading.Condition()  ##notified on new frame or error
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                frame = self._camera.capture_one(encode=self._encode)
+            except Exception as e:
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                frame = None
+            if frame is None:
+                self._stop.wait(0.01)  ##avoid spinning on a broken stream
+                continue
+            if not self._encode and any(frame is buf for buf in self._camera._preallocated_bufs()):
+                frame = frame.copy()  ##buffer is refilled by a following capture
+            with self._cond:
+                self.q.append(frame)
+                self._seq += 1
+                self.error = None
+                self._cond.notify_all()
+    
+    def latest(self, timeout=None):
+        """Returns newest frame, waiting for one newer than the frame returned by the previous call
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Duration in seconds to wait for a new frame, by default None (wait forever)
+
+        Returns
+        -------
+        3-D BGR numpy Array or bytes or None
+            Newest frame, None if no new frame arrived within `timeout`
+
+        Raises
+        ------
+        Exception
+            When no new frame arrived and the last capture raised, e.g. camera disconnected
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._read_seq or not self.error is None, timeout)
+            if self._seq > self._read_seq:
+                self._read_seq = self._seq
+                return self.q[-1]
+            if not self.error is None:
+                raise Exception("error during capture " + str(self.error)) from self.error
+            return None
+    
+    def stop(self, timeout=2):
+        """Stop pulling frames
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Duration in seconds to wait for thread to finish, by default 2
+        """
+        self._stop.set()
+        self._thread.join(timeout)
 
 class MultiCamera(Camera):
     """Subclass of :class: `Camera` to handle multiple channels in single instance
@@ -287,6 +817,12 @@ class MultiCamera(Camera):
         """Switch to camera channel. See :meth: `_switch_cam`
         """
         return self._switch_cam(dev_channel)
+    
+    async def aswitch_cam(self, dev_channel):
+        """Switch to camera channel without blocking the event loop. See :meth: `_switch_cam`
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._switch_cam, dev_channel)
         
     def get_dev_channel(self):
         """Returns current device channel
@@ -306,7 +842,9 @@ class HIKROBOTCamera(Camera):
 
     Requires custom wrapper around .dll/.so --> HikRobotCameras.py in MvImport_win / MvImport_armhf
     """    
-    def __init__(self, ip_addr: str=None, load_settings=False, retry=True, *args, **kwargs):
+    frame_timeout = 2  ##seconds to wait for a frame from background acquisition
+    
+    def __init__(self, ip_addr: str=None, load_settings=False, retry=True, double_buffer=False, *args, **kwargs):
         """Instantiate HIKROBOTCamera.
 
             **Only for GigE HIKROBOT cameras**
@@ -321,13 +859,21 @@ class HIKROBOTCamera(Camera):
             Whether to load default user settings upon initialization, by default False
         retry : bool, optional
             Whether to attempt re-connection when connection broken, by default True
+        double_buffer : bool, optional
+            Whether to acquire frames in a background thread into a pool of buffers while streaming, by default False
+            Requires `img_width` and `img_height`. Returned frame stays intact until the next capture; copy it if it must outlive that.
         """
         self._ip_addr = ip_addr
         self._load_settings = load_settings
         self._retry = retry  ##avoid throwing errors in connection and streaming, keep retrying in .stream() call
+        self._retry_count = 0  ##number of reconnection attempts made
+        self._abort_retry = threading.Event()  ##set to interrupt reconnection backoff, see :meth: `abort_retry`
         
         super().__init__(*args, **kwargs)
         
+        if double_buffer:
+            self._alloc_double_buffer()
+        
     def __repr__(self):
         return "HIKROBOT camera @ {}; Device {}".format(self._ip_addr, self._dev_addr)
     
@@ -388,7 +934,7 @@ class HIKROBOTCamera(Camera):
             else:
                 self._connected = True
                 self._streaming = False
-            
+    
     def _close(self):
         """Disconnect HIKROBOT camera
 
@@ -437,8 +983,14 @@ class HIKROBOTCamera(Camera):
         if self._verbose:
             self.cam.details()
     
+    def abort_retry(self):
+        """Interrupt ongoing reconnection attempts, e.g. from another thread on shutdown
+        """
+        self._abort_retry.set()
+    
     def _reconnect(self, trials=3, sleep=2):
-        """Attempt reconnection --> close and initialize
+        """Attempt reconnection --> close and initialize.
+            Backoff in between trials waits on an event so it can be interrupted by :meth: `abort_retry`
 
         Parameters
         ----------
@@ -447,24 +999,43 @@ class HIKROBOTCamera(Camera):
         sleep : int, optional
             Duration in seconds in between trials, by default 2
         """
-        def _attempt():
+        self._abort_retry.clear()
+        for attempt in range(trials):
+            if self._connected:
+                break
+            if self._verbose:
+                print("retry connection", attempt)
+            self._retry_count += 1
+            if not self.cam is None:
+                try:
+                    self._close()
+                except Exception as e:  ##broken connection, re-initialize anyways
+                    if self._verbose:
+                        print(str(e))
+            if self._abort_retry.wait(sleep):
+                break
             try:
-                ##retry
-                self._close()
-                time.sleep(sleep)
                 self._initialize()
             except Exception as e:
                 if self._verbose:
                     print(str(e))
+    
+    def _start_stream(self):
+        """Call to stream in wrapper class.
+            Wrapper may return ``(ok, errcode)`` or raise on error
 
-        j = trials
-        while (not self._connected) and j > 0:
-            if self._verbose:
-                print("retry connection", trials-j)
-            _attempt()
-            if self._connected:
-                break
-            j -= 1
+        Returns
+        -------
+        tuple
+            (ok, error) where error is error code or exception, None if ok
+        """
+        try:
+            ret = self.cam.stream()
+        except Exception as e:
+            return False, e
+        if isinstance(ret, tuple):
+            return bool(ret[0]), ret[1]
+        return True, None
     
     def _stream(self):    ##stream will propagate o execute connect a few times if exception is raised
         """Start HIKROBOT camera stream.
@@ -478,20 +1049,20 @@ class HIKROBOTCamera(Camera):
             return
         ##call to stream
         if not self._streaming:
-            try:
-                self.cam.stream()
-            except Exception as e:
+            ok, err = self._start_stream()
+            if ok:
+                time.sleep(0.1)
+                self._streaming = True
+                self._start_acquisition()
+            else:
                 self._streaming = False
                 self._connected = False
                 if self._retry:
                     if self._verbose:
-                        print("Error during streaming", e)
+                        print("Error during streaming", err)
                     self._reconnect()
                 else:
-                    raise Exception("Error during streaming " + str(e)) from e
-            else:
-                time.sleep(0.1)
-                self._streaming = True
+                    raise Exception("Error during streaming {}".format(err)) from (err if isinstance(err, Exception) else None)
     
     def _stop(self):
         """Stop camera stream.
@@ -505,6 +1076,7 @@ class HIKROBOTCamera(Camera):
             return
         ##call to stop
         if self._streaming:
+            self._stop_acquisition()
             try:
                 self.cam.stop()
             except Exception as e:
@@ -513,6 +1085,26 @@ class HIKROBOTCamera(Camera):
                 time.sleep(0.1)
                 self._streaming = False
             
+    def _acquire_into(self, buf):
+        """Capture one frame into `buf` for background acquisition.
+            Captured frame is copied into `buf`.
+
+        Parameters
+        ----------
+        buf : numpy.ndarray
+            Preallocated BGR frame buffer
+
+        Returns
+        -------
+        bool
+            True if `buf` is filled with a new frame, else False
+        """
+        image = self.cam.capture()
+        if image is None:
+            return False
+        np.copyto(buf, image)
+        return True
+            
     def _capture_one(self, encode=False):
         """Capture one frame from camera stream.
 
@@ -536,9 +1128,14 @@ class HIKROBOTCamera(Camera):
             return
         if self._streaming:
             try:
-                image = self.cam.capture()
+                if not self._acq_thread is None:  ##double-buffered, frame acquired in background
+                    image = self.get_latest(timeout=self.frame_timeout)
+                    if image is None:
+                        return None
+                else:
+                    image = self.cam.capture()
                 if encode:
-                    return self._encode_png(image)
+                    return self._encode(image)
                 else:
                     return image
             except Exception as e:
@@ -568,6 +1165,7 @@ else:
         def __init__(self, *args, **kwargs):
             """Instantiate RaspberryPiCamera. See :class: `Camera` for parameters
             """
+            self._gen = None  ##capture_continuous generator while streaming
             super().__init__(*args, **kwargs)
             
         def __repr__(self):
@@ -600,6 +1198,7 @@ else:
             if self._testing:
                 return
             if self._connected:
+                self._stop()
                 try:
                     self.cam.close()
                 except Exception as e:
@@ -618,6 +1217,27 @@ else:
             if self._testing:
                 return
             self._connect()
+        
+        def _stream(self):
+            """Start continuous capture through the video port, avoiding the still port mode switch per frame.
+                If ``testing`` is True, returns None.
+            """
+            if self._testing:
+                return
+            if self._connected and self._gen is None:
+                self._gen = self.cam.capture_continuous(self.cam_stream, format="bgr", use_video_port=True)
+                self._streaming = True
+        
+        def _stop(self):
+            """Stop continuous capture.
+                If ``testing`` is True, returns None.
+            """
+            if self._testing:
+                return
+            if not self._gen is None:
+                self._gen.close()
+                self._gen = None
+            self._streaming = False
                 
         def _capture_one(self, encode=False):
             """Capture one frame from PiCamera camera stream.
@@ -637,12 +1257,13 @@ else:
             ##return numpy array
             if self._streaming:
                 try:
-                    self.cam.capture(self.cam_stream, format="bgr")
+                    next(self._gen)
+                    image = self.cam_stream.array
                     ##IMPORTANT !!!! clear stream for next frame
+                    self.cam_stream.seek(0)
                     self.cam_stream.truncate(0)
-                    image = self.cam_stream.array
                     if encode:
-                        return self._encode_png(image)
+                        return self._encode(image)
                     else:
                         return image
                 except Exception as e:
@@ -668,16 +1289,16 @@ else:
             Acquisition using picamera package::
             
                 * Switching using I2C channel values and GPIO outputs
-                * Instances of PiCamera and corresponding PiRGBArray are to be instantiated everytime upon switching
-                **Preceeding instances must be closed/cleared to avoid out of resources conditions
+                * A single PiCamera instance and its raw YUV420 stream are kept alive across switches
+                  and frames are captured through the video port (no sensor re-initialization per switch)
+                **Instances must be closed/cleared on disconnect to avoid out of resources conditions
             
             [pseudo flow]::
-                - disconnect any existing instances
+                - instantiate instances once
                 - switch I2C channel and GPIO outputs
-                - instantiate new instances
                 - capture
-                - disconnect current instances
                 - repeat
+                - disconnect instances
 
             *Tested working with Raspberry Pi HQ camera v1.0 2018.
             SONY IMX477 sensor, 12MP (max. 4056px x 3040 px resolution)
@@ -741,24 +1362,59 @@ else:
             """
 
             self.switch_gpio = [7, 11, 12]
-            ##I2c command line
+            self._last_gpio = [None, None, None]  ##last written GPIO outputs, None if unknown
+            self._gen = None  ##capture_continuous generator while streaming
+            ##I2C write to adapter: bus 1, chip-address 0x70, data-address 0x00, value i2c_reg
+            ##equivalent command line (fallback when smbus2 unavailable)
             ##i2cset -y [i2cbus] [chip-address] [data-address] [value]
             ##https://www.abelectronics.co.uk/kb/article/1092/i2c-part-3---i-c-tools-in-linux
-            self.adapter_info = {"A":{"i2c_cmd":"i2cset -y 1 0x70 0x00 0x04",
+            self.i2c_addr = 0x70
+            self.adapter_info = {"A":{"i2c_reg":0x04,
+                                      "i2c_cmd":"i2cset -y 1 0x70 0x00 0x04",
                                       "gpio_sta":[0,0,1]},
-                                 "B":{"i2c_cmd":"i2cset -y 1 0x70 0x00 0x05",
+                                 "B":{"i2c_reg":0x05,
+                                      "i2c_cmd":"i2cset -y 1 0x70 0x00 0x05",
                                       "gpio_sta":[1,0,1]},
-                                 "C":{"i2c_cmd":"i2cset -y 1 0x70 0x00 0x06",
+                                 "C":{"i2c_reg":0x06,
+                                      "i2c_cmd":"i2cset -y 1 0x70 0x00 0x06",
                                       "gpio_sta":[0,1,0]},
-                                 "D":{"i2c_cmd":"i2cset -y 1 0x70 0x00 0x07",
+                                 "D":{"i2c_reg":0x07,
+                                      "i2c_cmd":"i2cset -y 1 0x70 0x00 0x07",
                                       "gpio_sta":[1,1,0]}}
             
             super().__init__(channels=channels, *args, **kwargs)
             
+            ##resolution not matching ISP alignment costs a crop (and copy downstream) per frame
+            if self._verbose and not self._shape is None and \
+                    (self._w_aligned, self._h_aligned) != (self._img_width, self._img_height):
+                print("Resolution {}x{} is padded to {}x{} by ISP, see `calc_picamera`".format(
+                    self._img_width, self._img_height, self._w_aligned, self._h_aligned))
+            
             ##trigger to ensure i2c is on
-            ret = os.popen("i2cdetect -y 1").read()
-            if self._verbose:
-                print(ret)
+            if _BUS is None:
+                ret = os.popen("i2cdetect -y 1").read()
+                if self._verbose:
+                    print(ret)
+            else:
+                try:
+                    _BUS.read_byte(self.i2c_addr)
+                except OSError as e:
+                    if self._verbose:
+                        print("I2C adapter not responding", e)
+        
+        def _select_i2c(self, dev_channel):
+            """Switch camera adapter I2C channel. Single ioctl via smbus2 if available, else i2cset command.
+
+            Parameters
+            ----------
+            dev_channel : string
+                Channel to switch to eg. "A", "B", "C", "D"
+            """
+            info = self.adapter_info[dev_channel]
+            if _BUS is None:
+                ret = os.popen(info["i2c_cmd"]).read()  ##returned value can be use to indicate error
+            else:
+                _BUS.write_byte_data(self.i2c_addr, 0x00, info["i2c_reg"])
             
         def __repr__(self):
             return "RaspPiCam camera Device picamera backend {}".format(self._dev_addr)
@@ -774,7 +1430,12 @@ else:
                     #initialize camera
                     self.cam = PiCamera(resolution=(self._img_width, self._img_height))
                     time.sleep(0.5)
-                    self.cam_stream = PiRGBArray(self.cam)
+                    ##raw YUV420 (I420) stream reused every frame, converted to BGR by OpenCV
+                    ##buffer is padded to width multiple of 32, height multiple of 16
+                    self.cam_stream = io.BytesIO()
+                    self._yuv_shape = (self._h_aligned * 3 // 2, self._w_aligned)
+                    self._yuv_count = self._yuv_shape[0] * self._yuv_shape[1]
+                    self._cropped = (self._w_aligned, self._h_aligned) != (self._img_width, self._img_height)
                 except Exception as e:
                     if self._verbose:
                         print("Exception during connecting", e)  ##silenced
@@ -799,6 +1460,7 @@ else:
                 return
             if self._connected:
                 try:
+                    self._stop()
                     if not self.cam is None:
                         self.cam.close()
                 except Exception as e:
@@ -825,6 +1487,20 @@ else:
             ##initial [X, 1, 1] = no camera
             gp.output(11, True)
             gp.output(12, True)
+            self._last_gpio = [None, True, True]
+        
+        def _set_gpio(self, gpio_sta):
+            """Write camera adapter GPIO outputs in a single call, skipped if unchanged
+
+            Parameters
+            ----------
+            gpio_sta : list
+                Output states for `switch_gpio` pins
+            """
+            new = [bool(x) for x in gpio_sta]
+            if new != self._last_gpio:
+                gp.output(self.switch_gpio, new)
+                self._last_gpio = new
         
         def _initialize(self):
             """Initialize camera (trigger I2C, switch to default channel).
@@ -844,7 +1520,7 @@ else:
             dev_channel : string
                 Channel to switch to eg. "A", "B", "C", "D"
             init : bool, optional
-                Whether to instantiate new instances, by default True
+                Whether to instantiate instances if not connected, by default True
             rest : float, optional
                 Time sleep in between switching in seconds, by default 0.5
 
@@ -856,26 +1532,30 @@ else:
             Raises
             ------
             Exception
-                When PiCamera or PiRGBArray stream is not initialized
+                When PiCamera or YUV stream is not initialized
             """    
             if self._testing:
                 return
 
             if dev_channel in self._channels:
+                if init and dev_channel == self._dev_channel and self._connected and not self.cam is None:
+                    return True  ##already on channel with a live instance
                 state = False    
+                resume = self._streaming
                 try:
-                    if init:
-                        self._close()
-                        time.sleep(rest)
+                    if resume:
+                        self._stop()  ##stop continuous capture before muxing
                     
                     if not self._testing:
-                        ret = os.popen(self.adapter_info[dev_channel]["i2c_cmd"]).read()  ##returned value can be use to indicate error
-                        for i in range(len(self.switch_gpio)):
-                            gp.output(self.switch_gpio[i], bool(self.adapter_info[dev_channel]["gpio_sta"][i]))
+                        self._select_i2c(dev_channel)
+                        self._set_gpio(self.adapter_info[dev_channel]["gpio_sta"])
                         time.sleep(rest)
                     
-                    if init:  ##initialize new PiCamera object
+                    if init and not self._connected:  ##initialize PiCamera object once, kept across switches
                         self._connect()
+                    
+                    if resume:
+                        self._stream()
                         # print("cam", self.cam)
                         # print("cam_stream", self.cam_stream)
                         
@@ -893,27 +1573,58 @@ else:
                     if self.cam is None:
                         raise Exception("PiCamera instance not initialized")
                     elif self.cam_stream is None:
-                        raise Exception("PiCamera RGBArray stream not initialized")
+                        raise Exception("PiCamera YUV stream not initialized")
                     return state
 
+        def _yuv_to_bgr(self):
+            """Convert raw I420 frame in internal stream to BGR (SIMD in OpenCV), cropped to camera resolution
+
+            Returns
+            -------
+            3-D BGR numpy Array
+                image data
+            """
+            mv = self.cam_stream.getbuffer()
+            try:
+                yuv = np.frombuffer(mv, np.uint8, count=self._yuv_count).reshape(self._yuv_shape)
+                image = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+                del yuv  ##release buffer export before stream is truncated
+            finally:
+                mv.release()
+            if self._cropped:
+                return image[:self._img_height, :self._img_width]
+            return image
+        
         def _stream(self):
-            """Do nothing. Camera stream handled by internal PiRGBArray stream.
+            """Start continuous capture through the video port into internal YUV stream.
+                ISP keeps streaming and each :meth: `_capture_one` takes the next frame.
+                If ``testing`` is True, returns None.
             """
-            pass
+            if self._testing:
+                return
+            if self._connected and self._gen is None:
+                self._gen = self.cam.capture_continuous(self.cam_stream, format="yuv", use_video_port=True)
+                self._streaming = True
         
-        def _stop_capture(self):
-            """Do nothing. Camera stream handled by internal PiRGBArray stream.
+        def _stop(self):
+            """Stop continuous capture.
+                If ``testing`` is True, returns None.
             """
-            pass
+            if self._testing:
+                return
+            if not self._gen is None:
+                self._gen.close()
+                self._gen = None
+            self._streaming = False
                 
         def _capture_one(self, encode=False):
-            """ Capture one frame from camera PiRGBArray stream.
+            """ Capture one frame from camera YUV stream.
                 If ``testing`` is True, returns None
 
             Parameters
             ----------
             encode : bool, optional
-                Whether to encode image data into png format bytes, by default False
+                Whether to encode image data into jpg format bytes, by default False
 
             Returns
             -------
@@ -926,10 +1637,14 @@ else:
             if self._connected:
                 image = None
                 try:
-                    self.cam.capture(self.cam_stream, format="bgr")
-                    image = self.cam_stream.array
+                    if not self._gen is None:
+                        next(self._gen)  ##frame from continuous capture
+                    else:
+                        self.cam.capture(self.cam_stream, format="yuv", use_video_port=True)
+                    image = self._yuv_to_bgr()
                     ##IMPORTANT !!!! clear stream for next frame
-                    self.cam_stream.truncate(0)
+                    self.cam_stream.seek(0)
+                    self.cam_stream.truncate()
                     
                 except Exception as e:
                     raise Exception("Exception during streaming " + str(e)) from e
@@ -937,7 +1652,7 @@ else:
                 else:
                     if not image is None:
                         if encode:
-                            return self._encode_png(image)
+                            return self._encode(image)
                         else:
                             return image
                     else:
@@ -966,6 +1681,16 @@ else:
                 
         def __repr__(self):
             return "RaspPiCam camera Device OpenCV backend {}".format(self._dev_addr)
+        
+        def _stream(self):
+            """Do nothing. Camera stream handled by OpenCV VideoCapture.
+            """
+            pass
+        
+        def _stop(self):
+            """Do nothing. Camera stream handled by OpenCV VideoCapture.
+            """
+            pass
             
         def _connect(self):
             """Establish camera connection via OpenCV VideoCapture.
@@ -983,11 +1708,12 @@ else:
                     #initialize camera
                     self.cam = cv2.VideoCapture(-1)
                     time.sleep(1)
-                    self.cam.set(cv2.CAP_PROP_BUFFERSIZE, 3)
+                    self.cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)  ##hold only the newest frame
                     self.cam.set(cv2.CAP_PROP_FRAME_WIDTH, self._img_width)
                     self.cam.set(cv2.CAP_PROP_FRAME_HEIGHT, self._img_height)
-                except Eception as e:
-                    self.cam.release()
+                except Exception as e:
+                    if not self.cam is None:  ##VideoCapture may have failed before assignment
+                        self.cam.release()
                     self.cam = None
                     self._connected = False
                     raise Exception("Exception during connecting " + str(e)) from e
@@ -1023,9 +1749,8 @@ else:
             
             checks = []
             for chn in self._channels:
-                os.system(self.adapter_info[chn]["i2c_cmd"])
-                for i in range(len(self.switch_gpio)):
-                    gp.output(self.switch_gpio[i], bool(self.adapter_info[chn]["gpio_sta"][i]))
+                self._select_i2c(chn)  ##smbus2 write, no shell fork per channel
+                self._set_gpio(self.adapter_info[chn]["gpio_sta"])
                 ret, frame = self.cam.read()
                 checks.append(ret)
                 time.sleep(1)
@@ -1040,7 +1765,7 @@ else:
             Parameters
             ----------
             encode : bool, optional
-                Whether to encode image data into png format bytes, by default False
+                Whether to encode image data into jpg format bytes, by default False
 
             Returns
             -------
@@ -1052,11 +1777,12 @@ else:
             if self._connected:
                 ##return numpy array
                 try:
-                    self.cam.grab()
-                    ret, image = self.cam.read()
-                    image.dtype=np.uint8
+                    self.cam.grab()  ##single grab, decoded only once by retrieve
+                    ret, image = self.cam.retrieve()
+                    if not ret:
+                        return None
                     if encode:
-                        return self._encode_png(image)
+                        return self._encode(image)
                     else:
                         return image
                     
@@ -1067,81 +1793,110 @@ else:
             else:
                 return None
             
-def calc_picamera():
-    """Utility to calculate suitable resolution for PiCamera.
-
-        TODO: verify computed resolutions on hardware
+###########################
+# image utils
+###########################
+def _align(x, y):
+    """Round `x` up to a multiple of `y` (power of 2)"""
+    return (x + (y - 1)) & ~(y - 1)
+
+def calc_compatible(side, ratio, max_width, max_height):
+    """Resolution matching PiCamera padding (width multiple of 32, height multiple of 16) for `side` and `ratio`
+
+    Parameters
+    ----------
+    side : int
+        Height if `ratio` >= 1 (width = height * ratio), else width (height = width * ratio)
+    ratio : float
+        Aspect ratio
+    max_width : int
+        Sensor maximum width
+    max_height : int
+        Sensor maximum height
+
+    Returns
+    -------
+    tuple or None
+        (width, height), None if no compatible resolution within sensor limits
     """
-    def calc(x, y):
-        return (x + (y - 1)) & ~(y - 1)
-
-    def calc_compatible(side, ratio, max_width, max_height):
-        if ratio >= 1:  ##width side
-            side = calc(side, 16)
-            while (side > max_height):
-                side -= 16
-            other = int(side * ratio)
-            other = calc(other, 32)
-            if other > max_width:
-                other -= 32
-            if other > max_width:  ##if matching width still exceed limit
-                return None
-            return (other, side)
-        else:  ##height side
-            side = calc(side, 32)
-            while (side > max_width):
-                side -= 32
-            other = int(side * ratio)
-            other = calc(other, 16)
-            if other > max_height:
-                other -= 16
-            if other > max_height:  ##if matching height still exceed limit
-                return None
-            return (side, other)
-
-    def get_compatible_list(max_width, max_height, follow="w", ratio=None):
-        assert follow in ["w", "h"]
-        if follow == "w":
-            max_side = max_width
-            if ratio is None:
-                ratio = max_height/max_width
-        else:
-            max_side = max_height
-            if ratio is None:
-                ratio = max_width/max_height
-        
-        out = []
-        for i in range(3):  ##up to 8 times smaller
-            side = max_side // (2 ** i)
-            out.append(calc_compatible(side, ratio, max_width, max_height))
-        
-        return out, ratio
+    if ratio >= 1:  ##width side
+        side = _align(side, 16)
+        while (side > max_height):
+            side -= 16
+        other = int(side * ratio)
+        other = _align(other, 32)
+        if other > max_width:
+            other -= 32
+        if other > max_width:  ##if matching width still exceed limit
+            return None
+        return (other, side)
+    else:  ##height side
+        side = _align(side, 32)
+        while (side > max_width):
+            side -= 32
+        other = int(side * ratio)
+        other = _align(other, 16)
+        if other > max_height:
+            other -= 16
+        if other > max_height:  ##if matching height still exceed limit
+            return None
+        return (side, other)
 
+def get_compatible_list(max_width, max_height, follow="w", ratio=None):
+    """Compatible resolutions at full, 1/2 and 1/4 of sensor size. See :func: `calc_compatible`
 
-    ##Example for RaspberryPi HQ camera
-    max_width = 4056
-    max_height = 3040
+    Returns
+    -------
+    list, float
+        List of (width, height) or None, ratio used
+    """
+    assert follow in ["w", "h"]
+    if follow == "w":
+        max_side = max_width
+        if ratio is None:
+            ratio = max_height/max_width
+    else:
+        max_side = max_height
+        if ratio is None:
+            ratio = max_width/max_height
     
-    print("By width, default ratio")
-    print(get_compatible_list(max_width, max_height, follow="w")[0])
-    print("By width, 4:3 ratio")
-    print(get_compatible_list(max_width, max_height, follow="w", ratio=3/4)[0])
-    print("By width, 16:9 ratio")
-    print(get_compatible_list(max_width, max_height, follow="w", ratio=9/16)[0])
-    print("By height, default ratio")
-    print(get_compatible_list(max_width, max_height, follow="h")[0])
-    print("By height, 4:3 ratio")
-    print(get_compatible_list(max_width, max_height, follow="h", ratio=4/3)[0])
-    print("By height, 16:9 ratio")
-    print(get_compatible_list(max_width, max_height, follow="h", ratio=16/9)[0])
+    out = []
+    for i in range(3):  ##up to 8 times smaller
+        side = max_side // (2 ** i)
+        out.append(calc_compatible(side, ratio, max_width, max_height))
+    
+    return out, ratio
+
+##Precomputed for RaspberryPi HQ camera (4056 x 3040) with :func: `get_compatible_list` and :func: `calc_compatible`
+##Recompute with these when adding ratios or sensors
+_COMPATIBLE_RESOLUTIONS = {
+    "By width, default ratio": [(4032, 3024), (2048, 1536), (1024, 768)],
+    "By width, 4:3 ratio": [(4032, 3024), (2048, 1536), (1024, 768)],
+    "By width, 16:9 ratio": [(4032, 2272), (2048, 1152), (1024, 576)],
+    "By height, default ratio": [(4032, 3040), (2048, 1520), (1024, 768)],
+    "By height, 4:3 ratio": [(4032, 3040), (2048, 1520), (1024, 768)],
+    "By height, 16:9 ratio": [None, (2720, 1520), (1376, 768)],
+}
+##common resolution: name -> (by width, by height)
+_COMMON_RESOLUTIONS = {
+    "SD": ((640, 480), (640, 480)),
+    "HD": ((1280, 720), (1280, 720)),
+    "Full HD": ((1920, 1088), (1952, 1088)),
+    "2K": ((2560, 1440), (2560, 1440)),
+    "4K": ((3488, 2176), (3488, 2160)),
+    "8K": ((4032, 2272), None),
+}
+
+def calc_picamera():
+    """Utility to print suitable resolutions for PiCamera (RaspberryPi HQ camera) from precomputed tables.
+
+        TODO: verify computed resolutions on hardware
+    """
+    for name, resolutions in _COMPATIBLE_RESOLUTIONS.items():
+        print(name)
+        print(resolutions)
 
     print("common resolution")
-    for name, x, y in [("SD", 640, 480),
-                       ("HD", 1280, 720),
-                       ("Full HD", 1920, 1080),
-                       ("2K", 2560, 1440),
-                       ("4K", 3480, 2160),
-                       ("8K", 7680, 4320)]:
+    for name, (by_width, by_height) in _COMMON_RESOLUTIONS.items():
         print(name, "by width", "by height")
-        print(calc_compatible(x, y/x, max_width, max_height),
-              calc_compatible(y, x/y, max_width, max_height))
\ No newline at end of file
+        print(by_width, by_height)
\ No newline at end of file
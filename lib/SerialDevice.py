@@ -2,6 +2,7 @@
 """
 import serial
 import time
+import asyncio
 import platform
 if platform.machine() in ['armv7l']:
     serial_prefix = "/dev/"
@@ -21,7 +22,9 @@ class SerialDevice(object):
     object : Python object
         Base object
     """
-    def __init__(self, port: serial.Serial, port_name=None, testing=False, auto_reconnect=False, verbose=False):  
+    drain_margin = 0.005  ##seconds added to computed transmit time, see `drain` in :meth: `_write`
+    
+    def __init__(self, port: serial.Serial, port_name=None, testing=False, auto_reconnect=False, low_latency=True, encode=None, decode=None, verbose=False):  
         """Instantiate Serial Device
             default timeout=None --> wait forever
 
@@ -35,6 +38,15 @@ class SerialDevice(object):
             Whether to run the class in testing mode, by default False
         auto_reconnect : bool, optional
             Whether to run reconnection when found broken, by default False
+        low_latency : bool, optional
+            Whether to set port to low latency mode (ASYNC_LOW_LATENCY) upon initialization, by default True
+            Only supported on Linux, silently ignored on other platforms
+        encode : callable, optional
+            Function applied to data before writing to port, e.g. ``bytes.fromhex``, by default None
+            If None, :meth: `_encode` is used
+        decode : callable, optional
+            Function applied to data read from port, e.g. ``struct.Struct(">h").unpack``, by default None
+            If None, :meth: `_decode` is used
         verbose : bool, optional
             Execution verbosity, by default False
 
@@ -44,16 +56,24 @@ class SerialDevice(object):
             When string or others is passed for serial port object
         """
         self._device = port
+        self._port_timeout = getattr(port, "timeout", None)  ##configured read timeout, see :meth: `_apply_timeout`
         self._port_name = port_name
         self._testing = testing
         self._auto_reconnect = auto_reconnect
+        self._low_latency = low_latency
         self._verbose = verbose
+        if not encode is None:
+            self._encode = encode  ##callable bound directly, no extra Python frame
+        if not decode is None:
+            self._decode = decode
         
         if self._testing:
             if self._verbose:
                 print("Serial device in testing mode")
             self._device = None  ##force to testing mode
         
+        self._specialize()
+        
         ###for testing
         if self._device is None:
             if self._verbose:
@@ -123,6 +143,20 @@ class SerialDevice(object):
             else:
                 print("device auto-reconnection turn OFF")
     
+    def _specialize(self):
+        """Bind specialized read/write methods for this instance's flags.
+            Testing instances never touch a port, non-verbose instances skip all verbose branches.
+            Subclasses overriding `_write`/`_read` keep their own methods.
+        """
+        cls = type(self)
+        if cls._write is SerialDevice._write and cls._read is SerialDevice._read:
+            if self._testing:
+                self._write = self._write_noop
+                self._read = self._read_noop
+            elif not self._verbose:
+                self._write = self._write_fast
+                self._read = self._read_fast
+    
     @staticmethod
     def _encode(val):  ##for overriding
         return val
@@ -131,11 +165,24 @@ class SerialDevice(object):
         return val
     
     def initialize(self):
-        """Reset port buffers and internal status boolean
+        """Reset port buffers and internal status boolean.
+            Set port to low latency mode if `low_latency` is True
+            --USB-serial adapters (FTDI etc.) otherwise hold bytes up to the driver latency timer (~16 ms)
         """
         self._device.reset_input_buffer()
         self._device.reset_output_buffer()
         self._device_error = False
+        self._dirty_output = False  ##set when a write fails, output buffer to be discarded before next write
+        ##duration of one byte on the line: start bit + data bits + parity bit + stop bits
+        dev = self._device
+        parity_bits = 0 if dev.parity == serial.PARITY_NONE else 1
+        self._byte_dur = (1 + dev.bytesize + dev.stopbits + parity_bits) / dev.baudrate
+        if self._low_latency:
+            try:
+                self._device.set_low_latency_mode(True)  ##linux only
+            except (AttributeError, NotImplementedError, OSError, ValueError) as e:
+                if self._verbose:
+                    print("Low latency mode not supported", e)
     
     def connect(self):
         """Open port object
@@ -158,6 +205,60 @@ class SerialDevice(object):
             self._device = None   
             del old_device  ##discard the device anyways
         
+    def _drain_time(self, n_bytes):
+        """Returns duration to transmit a number of bytes at current port settings
+
+        Parameters
+        ----------
+        n_bytes : int
+            Number of bytes
+
+        Returns
+        -------
+        float
+            Duration in seconds
+        """
+        return n_bytes * self._byte_dur
+        
+    def _apply_timeout(self, timeout):
+        """Set port read timeout only if it differs from the current one,
+            every assignment reconfigures the port in pySerial (tcsetattr)
+
+        Parameters
+        ----------
+        timeout : float or None
+            Duration in seconds
+        """
+        dev = self._device
+        if dev.timeout != timeout:
+            dev.timeout = timeout
+    
+    def _timed_read(self, size, timeout):
+        """Read by size from port with a forced port timeout.
+            Blocking wait is handled by the OS (poll / WaitCommEvent) instead of polling ``in_waiting``
+            The timeout is kept until a read without forced timeout, so repeated forced reads do not reconfigure the port
+
+        Parameters
+        ----------
+        size : int
+            Number of byte to be read from port
+        timeout : float
+            Duration in seconds to wait for `size` bytes
+
+        Returns
+        -------
+        bytes
+            Data read from port, may be shorter than `size` when timeout elapsed
+        """
+        self._apply_timeout(timeout)
+        ret = self._device.read(size)
+        if self._verbose:
+            if len(ret) < size:
+                print("read timeout")
+            else:
+                print("read before timeout", ret)
+        return ret
+        
     def _write_read(self, instruction, size=None, sleep=0, 
                     reset=True, reset_out=True, reset_in=True, check=False):
         """Write to and read by size from port
@@ -199,7 +300,7 @@ class SerialDevice(object):
             else:
                 return None
         
-    def _write(self, instruction, sleep=0, reset=True, check=False, reset_check=False, force_timeout=None):
+    def _write(self, instruction, sleep=0, reset=True, check=False, reset_check=False, force_timeout=None, drain=False):
         """Write to port
 
         Parameters
@@ -210,12 +311,16 @@ class SerialDevice(object):
             Duration in seconds to delay after writing to port, by default 0
         reset : bool, optional
             Whether to reset buffers before writing to port, by default True
+            Output buffer is only reset when previous write failed
         check : bool, optional
             Whether to check matching reply after writing to port, by default False
         reset_check : bool, optional
             Whether to reset input buffer after checking matching reply from port after writing, by default False
         force_timeout : _type_, optional
             Duration in seconds to force break of write or read actions, useful when port is in blocking mode, by default None
+        drain : bool, optional
+            Whether to wait at least until `instruction` left the port (transmit time plus `drain_margin`), by default False
+            Extends `sleep` if shorter, e.g. before switching an RS485 transceiver to receive
 
         Returns
         -------
@@ -223,40 +328,42 @@ class SerialDevice(object):
             If write is successful, return matching reply if any
             Else, None
         """
-        if not self._device is None:
+        dev = self._device
+        if not dev is None:
             if reset:
-                self._device.reset_input_buffer()
-                self._device.reset_output_buffer()  ##discard output buffer
-            to_send = self._encode(instruction)
+                dev.reset_input_buffer()
+                if self._dirty_output:
+                    dev.reset_output_buffer()  ##discard output buffer left by failed write
+                    self._dirty_output = False
+            if self._encode is SerialDevice._encode:  ##default encoding is pass-through
+                to_send = instruction
+            else:
+                to_send = self._encode(instruction)
+            n = len(to_send)
             if self._verbose:
                 print("write", instruction.hex(), to_send.hex())
             try:
-                self._device.write(to_send)
+                dev.write(to_send)
             except Exception as e:
                 if self._verbose:
                     print("Serial write error " + str(e))
                 self._device_error = True
+                self._dirty_output = True
             else:
-                time.sleep(sleep)
+                if drain:
+                    sleep = max(sleep, self._drain_time(n) + self.drain_margin)  ##until the bytes left the port
+                if sleep:
+                    time.sleep(sleep)
                 if self._verbose:
                     print("done")
                 if check: 
                     if force_timeout:  ##time sleep to break in seconds
-                        ret = None
-                        start = time.time()
-                        while (time.time() - start) < force_timeout:
-                            ##check if there's data to read
-                            if self._device.in_waiting >= len(to_send):
-                                ret = self._device.read(len(to_send))
-                                if self._verbose:
-                                    print("read before timeout", ret)
-                                break
-                        if self._verbose:
-                            print("read timeout")
+                        ret = self._timed_read(n, force_timeout)
                     else:
-                        ret = self._device.read(len(to_send))
+                        self._apply_timeout(self._port_timeout)  ##after a forced timeout
+                        ret = dev.read(n)
                     if reset_check:
-                        self._device.reset_input_buffer()
+                        dev.reset_input_buffer()
                     if self._verbose:
                         print("check", ret)
                     if ret == to_send:
@@ -282,6 +389,7 @@ class SerialDevice(object):
             Duration in seconds to delay before reading from port, by default 0
         reset : bool, optional
             Whether to reset input buffer after reading from port, by default True
+            Skipped when input buffer is already drained
         decode : bool, optional
             Whether to execute decode function on received data, by default True
         force_timeout : _type_, optional
@@ -293,23 +401,16 @@ class SerialDevice(object):
             If data received and decoded sucesssully
             Else, None
         """
-        if not self._device is None:  ##not reading if size is None
+        dev = self._device
+        if not dev is None:  ##not reading if size is None
             time.sleep(sleep)
             ret = None
             try:
                 if force_timeout:  ##time sleep to break in seconds
-                    start = time.time()
-                    while (time.time() - start) < force_timeout:
-                        ##check if there's data to read
-                        if self._device.in_waiting >= size:
-                            ret = self._device.read(size)
-                            if self._verbose:
-                                print("read before timeout", ret)
-                            break
-                    if self._verbose:
-                        print("read timeout")
+                    ret = self._timed_read(size, force_timeout)
                 else:
-                    ret = self._device.read(size)
+                    self._apply_timeout(self._port_timeout)  ##after a forced timeout
+                    ret = dev.read(size)
             except Exception as e:
                 if self._verbose:
                     print("Serial read error " + str(e))
@@ -323,8 +424,8 @@ class SerialDevice(object):
                             response = self._decode(ret)
                         else:
                             response = ret
-                        if reset:
-                            self._device.reset_input_buffer()  ##discard input buffer
+                        if reset and dev.in_waiting > 0:
+                            dev.reset_input_buffer()  ##discard remaining input buffer
                         return response
                     else:  ##read failed
                         if self._auto_reconnect:  ##execute reconnection if failed
@@ -339,15 +440,94 @@ class SerialDevice(object):
                             self.reconnect()
                     return None
     
+    def _write_noop(self, *args, **kwargs):
+        """:meth: `_write` for testing mode, nothing is written
+        """
+        return None
+    
+    def _read_noop(self, *args, **kwargs):
+        """:meth: `_read` for testing mode, nothing is read
+        """
+        return None
+    
+    def _write_fast(self, instruction, sleep=0, reset=True, check=False, reset_check=False, force_timeout=None, drain=False):
+        """:meth: `_write` without verbose output. See :meth: `_write` for parameters
+        """
+        dev = self._device
+        if dev is None:
+            return None
+        if reset:
+            dev.reset_input_buffer()
+            if self._dirty_output:
+                dev.reset_output_buffer()  ##discard output buffer left by failed write
+                self._dirty_output = False
+        if self._encode is SerialDevice._encode:  ##default encoding is pass-through
+            to_send = instruction
+        else:
+            to_send = self._encode(instruction)
+        n = len(to_send)
+        try:
+            dev.write(to_send)
+        except Exception:
+            self._device_error = True
+            self._dirty_output = True
+            print("force reconnection")  ##execute reconnection if failed
+            self.reconnect()
+            return None
+        if drain:
+            sleep = max(sleep, self._drain_time(n) + self.drain_margin)
+        if sleep:
+            time.sleep(sleep)
+        if not check:
+            return None
+        if force_timeout:
+            ret = self._timed_read(n, force_timeout)
+        else:
+            self._apply_timeout(self._port_timeout)
+            ret = dev.read(n)
+        if reset_check:
+            dev.reset_input_buffer()
+        if ret == to_send:
+            return self._decode(ret)
+        return None
+    
+    def _read_fast(self, size, sleep=0, reset=True, decode=True, force_timeout=None):
+        """:meth: `_read` without verbose output. See :meth: `_read` for parameters
+        """
+        dev = self._device
+        if dev is None:
+            return None
+        if sleep:
+            time.sleep(sleep)
+        try:
+            if force_timeout:
+                ret = self._timed_read(size, force_timeout)
+            else:
+                self._apply_timeout(self._port_timeout)
+                ret = dev.read(size)
+        except Exception:
+            self._device_error = True
+            return None
+        if ret:
+            if reset and dev.in_waiting > 0:
+                dev.reset_input_buffer()  ##discard remaining input buffer
+            if decode:
+                return self._decode(ret)
+            return ret
+        if self._auto_reconnect and self._device_error:  ##execute reconnection if failed
+            print("force reconnection")
+            self.reconnect()
+        return None
+    
     def _read_while(self, sleep=0, sleep_inner=0, reset=False, decode=True):
-        """Read from port by one byte at a time while data available
+        """Read from port while data available, all bytes waiting are read at once
 
         Parameters
         ----------
         sleep : int, optional
             Duration in seconds to delay before start reading from port, by default 0
         sleep_inner : int, optional
-            Duration in seconds to delay before reading each byte from port, by default 0
+            Duration in seconds to delay in between reads for more data to arrive, by default 0
         reset : bool, optional
             Whether to reset input buffer after finish reading, by default False
         decode : bool, optional
@@ -359,16 +539,22 @@ class SerialDevice(object):
             If data received and decoded sucesssully
             Else, None
         """
+        dev = self._device
+        dev_read = dev.read
         time.sleep(sleep)
-        out = None
-        while self._device.in_waiting:
-            if out is None:
-                out = self._read(1, sleep=sleep_inner, reset=False, decode=False)
-            else:
-                out += self._read(1, sleep=sleep_inner, reset=False, decode=False)
-
+        buf = bytearray()  ##accumulate in place, no intermediate bytes objects
+        while True:
+            n = dev.in_waiting
+            if not n:
+                break
+            buf.extend(dev_read(n))  ##bulk read, one call per burst
+            if sleep_inner:
+                time.sleep(sleep_inner)
         if reset:
-            self._device.reset_input_buffer()  ##discard input buffer
+            dev.reset_input_buffer()  ##discard input buffer
+        if not buf:  ##nothing received, decoder is not called with None
+            return None
+        out = bytes(buf)
 
         ##accum only decode
         if decode:
@@ -376,8 +562,52 @@ class SerialDevice(object):
         else:
             return out
     
-    def reconnect(self, trials=3):
-        """Reconnect to port and retry by a number of trials
+    def _open(self, to_open, prop, polls=10, poll_interval=0.01):
+        """Open serial port and poll until it is responsive, i.e. its input queue can be queried
+
+        Parameters
+        ----------
+        to_open : str
+            Full port name to open
+        prop : dict
+            Port settings passed to pySerial object
+        polls : int, optional
+            Number of polls on port status before giving up, by default 10
+        poll_interval : float, optional
+            Duration in seconds in between polls, by default 0.01
+
+        Returns
+        -------
+        serial.Serial or None
+            pySerial object if port opened and responsive, else None
+        """
+        try:
+            device = serial.Serial(port=to_open, **prop)
+        except (serial.SerialException, OSError) as e:
+            if self._verbose:
+                print("Error", e)
+            return None
+        for _ in range(polls):
+            try:
+                if device.is_open:
+                    device.in_waiting  ##non-blocking ioctl, raises while the device is not ready
+                    return device
+            except (serial.SerialException, OSError):
+                pass
+            time.sleep(poll_interval)
+        device.close()
+        return None
+    
+    def reconnect(self, trials=3, settle_delay=0.05):
+        """Reconnect to port and retry by a number of trials.
+            Reopened port is set up as in instantiation, see :meth: `initialize`
+
+        Parameters
+        ----------
+        trials : int, optional
+            Number of trials to attempt after first failure, by default 3
+        settle_delay : float, optional
+            Duration in seconds to wait after closing port before reopening, by default 0.05
 
         Returns
         -------
@@ -392,22 +622,23 @@ class SerialDevice(object):
             ## but which connection? signal converter or the device unresponsive?
             ## if it's signal converter, need to make new object / clear buffer etc. given the port name is locked
             ## if it's device, just wait until it responses??
-        ##obtain current port settings
-        prop = {x: self._device.__dict__["_"+x]for x in ["baudrate", "parity", "stopbits", "bytesize", "timeout"]}
+        ##obtain current port settings, incl. flow control (xonxoff, rtscts, dsrdtr)
+        prop = self._device.get_settings()
+        prop["timeout"] = self._port_timeout  ##not a forced timeout left from last read
         self.disconnect()
-        time.sleep(2)
+        time.sleep(settle_delay)
         if not serial_prefix in self._port_name:
             to_open = serial_prefix + self._port_name 
         else:
             to_open = self._port_name
-        self._device = serial.Serial(port=to_open,**prop)
+        self._device = self._open(to_open, prop)
         j = trials
         while (self._device is None) and j > 0:
             if self._verbose:
                 print("retry serial connection", trials-j)
             self.disconnect()
-            time.sleep(2)
-            self._device = serial.Serial(port=to_open,**prop)
+            time.sleep(settle_delay)
+            self._device = self._open(to_open, prop)  ##settings retained in prop, not re-applied
             j -= 1
             
             if not self._device is None:
@@ -415,7 +646,8 @@ class SerialDevice(object):
         if self._device is None:   ##after retry also fail then pass None, handle at higher levels
             return None
         else:
-            self._device_error = False
+            self.initialize()  ##same setup as a new port, incl. low latency mode and error flags
+            self._specialize()
             return True
     
     def write_read(self, *args, **kwargs):
@@ -423,6 +655,26 @@ class SerialDevice(object):
         """
         return self._write_read(*args, **kwargs)
     
+    async def awrite_read(self, *args, executor=None, **kwargs):
+        """Write to and read from port without blocking the event loop.
+            Blocking port I/O runs in `executor` so exchanges with several ports
+            can be awaited together, e.g. ``asyncio.gather(dev1.awrite_read(...), dev2.awrite_read(...))``
+
+            Each instance must not be awaited concurrently with itself (one port, one exchange at a time)
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor, optional
+            Executor to run port I/O in, by default None (event loop default thread pool)
+
+        Returns
+        -------
+        str or bytes or None
+            See :meth: `write_read`
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, lambda: self._write_read(*args, **kwargs))
+    
     def write(self, *args, **kwargs):
         """Write to port
         """
@@ -433,8 +685,48 @@ class SerialDevice(object):
         """
         return self._read(*args, **kwargs)
     
+    def read_until(self, expected=serial.LF, max_size=None, timeout=None, decode=True):
+        """Read from port until `expected` framing bytes are found, `max_size` is reached or timeout elapsed
+
+        Parameters
+        ----------
+        expected : bytes, optional
+            Framing bytes to stop reading at, by default LF (0x0A)
+        max_size : int or None, optional
+            Maximum number of bytes to read, by default None (no limit)
+        timeout : float or None, optional
+            Duration in seconds to wait for the frame, by default None (use port timeout)
+        decode : bool, optional
+            Whether to execute decode function on received data, by default True
+
+        Returns
+        -------
+        str or bytes or None
+            If data received and decoded sucesssully
+            Else, None
+        """
+        dev = self._device
+        if dev is None:
+            return None
+        try:
+            self._apply_timeout(self._port_timeout if timeout is None else timeout)
+            ret = dev.read_until(expected, max_size)
+        except Exception as e:
+            if self._verbose:
+                print("Serial read error " + str(e))
+            self._device_error = True
+            return None
+        if self._verbose:
+            print("read until", expected, ret.hex())
+        if not ret:
+            return None
+        if decode:
+            return self._decode(ret)
+        return ret
+    
     def read_while(self, *args, **kwargs):
-        """Read from port by one byte at a time while data available
+        """Read from port while data available.
+            For protocols with a framing byte, prefer :meth: `read_until` which stops as soon as the frame ends
         """
         return self._read_while(*args, **kwargs)
        
\ No newline at end of file
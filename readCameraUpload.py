@@ -1,63 +1,205 @@
 import datetime
-from lib.Cameras import HIKROBOTCamera
+from lib.Cameras import HIKROBOTCamera, Camera
 from google.cloud import storage
-from google.oauth2 import service_account
+from google.api_core.exceptions import ServiceUnavailable, TooManyRequests, InternalServerError, DeadlineExceeded
+import requests
+import time
+from db_client import cred
 import numpy as np
 import os
 import cv2
+import queue
+import atexit
+import threading
 
-def initialize_firebase():
-    cred = service_account.Credentials.from_service_account_file('db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json')
-    #cred = credentials.Certificate("db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json")
-    #firebase_admin.initialize_app(cred, {'storageBucket': 'hortilite-test.firebasestorage.app'})
-    storage_client = storage.Client(credentials=cred, project="hortilite-test")
-    return storage_client.bucket('hortilite-test.firebasestorage.app')
+try:  # optional, SIMD-accelerated PNG encoder
+    import fpng_py
+except ImportError:
+    fpng_py = None
 
-def upload_image_to_firebase(bucket, image, file_name):
-    cv2.imwrite(file_name, image)
-    blob = bucket.blob(file_name)
-    with open(file_name, "rb") as image_file:
-        blob.upload_from_file(image_file, content_type="image/jpeg")
-    blob.make_public()
-    os.remove(file_name)
-    return blob.public_url
+_CONTENT_TYPES = {'jpg': "image/jpeg", 'jpeg': "image/jpeg", 'png': "image/png"}
 
-def capture_and_upload(camera_ip="192.168.1.205"):
-    camera = None
-    try:
-        bucket = initialize_firebase()
-        camera = HIKROBOTCamera(ip_addr=camera_ip, load_settings=True)
-        camera.connect()
+# JPEG quality of uploaded captures, cv2.imwrite's default as the previous file-based upload
+JPEG_QUALITY = 95
 
-        if not camera.connected():
-            print("Failed to connect to the camera.")
-            return
+# A stalled upload gives up after UPLOAD_TIMEOUT seconds and is attempted up to UPLOAD_RETRIES times,
+# waiting 0.5s, 1s... in between. Only transient errors are retried, e.g. not Forbidden or NotFound
+UPLOAD_TIMEOUT = 10
+UPLOAD_RETRIES = 3
+_RETRY_ERRORS = (ServiceUnavailable, TooManyRequests, InternalServerError, DeadlineExceeded,
+                 requests.exceptions.ConnectionError, requests.exceptions.Timeout, TimeoutError, ConnectionError)
+
+# Storage bucket and cameras are kept for the lifetime of the process instead of being set up per capture
+_bucket = None
+_cameras = {}
+_cameras_lock = threading.Lock()
+
+def initialize_firebase():
+    global _bucket
+    if _bucket is None:
+        #cred = credentials.Certificate("db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json")
+        #firebase_admin.initialize_app(cred, {'storageBucket': 'hortilite-test.firebasestorage.app'})
+        storage_client = storage.Client(credentials=cred, project="hortilite-test")
+        _bucket = storage_client.bucket('hortilite-test.firebasestorage.app')
+    return _bucket
 
+# Connected, streaming camera for an IP, reconnected only if its connection was dropped
+def get_camera(camera_ip):
+    with _cameras_lock:
+        camera = _cameras.get(camera_ip)
+        if camera is None:
+            camera = _cameras[camera_ip] = HIKROBOTCamera(ip_addr=camera_ip, load_settings=True)
+    if not camera.connected():
+        camera.connect()
+        if not camera.connected():
+            return None
         print("Camera connected successfully.")
+    if not camera.streaming():
         camera.stream()
         print("Camera streaming started.")
+    return camera
+
+def release_camera(camera_ip):
+    with _cameras_lock:
+        camera = _cameras.pop(camera_ip, None)
+    if camera is None:
+        return
+    try:
+        if camera.streaming():
+            camera.stop()
+            print("Camera streaming stopped.")
+        if camera.connected():
+            camera.close()
+            print("Camera disconnected.")
+    except Exception as e:
+        print(f"Error releasing camera {camera_ip} : {e}")
+
+def release_cameras():
+    for camera_ip in list(_cameras):
+        release_camera(camera_ip)
+
+atexit.register(release_cameras)
+
+# Encode in memory, format taken from the file extension
+def encode_image(image, fmt="jpg"):
+    if fmt == "png" and fpng_py is not None:
+        height, width = image.shape[:2]
+        return fpng_py.fpng_encode_image_to_memory(cv2.cvtColor(image, cv2.COLOR_BGR2RGB).tobytes(), width, height, 3)
+    return Camera._encode(image, fmt=fmt, quality=JPEG_QUALITY)
+
+def _image_format(file_name):
+    return os.path.splitext(file_name)[1][1:].lower() or "jpg"
+
+def _with_retries(call):
+    for attempt in range(UPLOAD_RETRIES):
+        try:
+            return call()
+        except _RETRY_ERRORS:
+            if attempt == UPLOAD_RETRIES - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+# Upload and make_public are retried separately, a failed make_public does not upload the image again
+def upload_encoded_to_firebase(bucket, encoded, file_name):
+    blob = bucket.blob(file_name)
+    content_type = _CONTENT_TYPES.get(_image_format(file_name), "application/octet-stream")
+    _with_retries(lambda: blob.upload_from_string(encoded, content_type=content_type, timeout=UPLOAD_TIMEOUT))
+    _with_retries(lambda: blob.make_public(timeout=UPLOAD_TIMEOUT))
+    return blob.public_url
+
+def upload_image_to_firebase(bucket, image, file_name):
+    encoded = encode_image(image, _image_format(file_name))
+    if encoded is None:
+        raise Exception(f"Failed to encode {file_name}")
+    return upload_encoded_to_firebase(bucket, encoded, file_name)
+
+def _image_file_name(camera_ip):
+    return f"{camera_ip.replace('.', '_')}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+
+def capture_image(camera_ip="192.168.1.205", camera=None):
+    try:
+        if camera is None:
+            camera = get_camera(camera_ip)
+        if camera is None:
+            print("Failed to connect to the camera.")
+            return None
 
-        camera_name = camera_ip.replace('.', '_')
         image_data = camera.capture_one()
+        if image_data is None:
+            print("Failed to capture image.")
+        return image_data
+
+    except Exception:
+        release_camera(camera_ip)  # reconnect on next capture
+        raise
+
+def capture_and_upload(camera_ip="192.168.1.205", bucket=None, camera=None):
+    try:
+        if bucket is None:
+            bucket = initialize_firebase()
+        image_data = capture_image(camera_ip, camera)
         if image_data is not None:
-            file_name = f"{camera_name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            public_url = upload_image_to_firebase(bucket, image_data, file_name)
+            public_url = upload_image_to_firebase(bucket, image_data, _image_file_name(camera_ip))
             print(f"Image uploaded successfully. Public URL: {public_url}")
-        else:
-            print("Failed to capture image.")
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
-    finally:
-        if camera and camera.connected():
-            camera.stop()
-            print("Camera streaming stopped.")
-        if camera:
-            camera.close()
-            print("Camera disconnected.")
+# Capture, encode and upload run as pipeline stages connected by bounded queues,
+# so uploads of one camera overlap captures of the others. Cameras are captured concurrently.
+def capture_and_upload_all(camera_ips, queue_size=4):
+    bucket = initialize_firebase()
+    captured = queue.Queue(maxsize=queue_size)
+    encoded = queue.Queue(maxsize=queue_size)
+    public_urls = {}
 
-#if __name__ == "__main__":
-#    capture_and_upload()
+    def capture_stage(camera_ip):
+        try:
+            image_data = capture_image(camera_ip)
+            if image_data is not None:
+                captured.put((camera_ip, _image_file_name(camera_ip), image_data))
+        except Exception as e:
+            print(f"Failed to capture camera {camera_ip} : {e}")
+
+    def encode_stage():
+        while True:
+            item = captured.get()
+            if item is None:
+                break
+            camera_ip, file_name, image_data = item
+            try:
+                data = encode_image(image_data, _image_format(file_name))
+            except Exception as e:
+                data = None
+                print(f"Encoding error : {e}")
+            if data is None:
+                print(f"Failed to encode image of camera {camera_ip}")
+                continue
+            encoded.put((camera_ip, file_name, data))
+        encoded.put(None)
 
+    def upload_stage():
+        while True:
+            item = encoded.get()
+            if item is None:
+                break
+            camera_ip, file_name, data = item
+            try:
+                public_urls[camera_ip] = upload_encoded_to_firebase(bucket, data, file_name)
+                print(f"Image uploaded successfully. Public URL: {public_urls[camera_ip]}")
+            except Exception as e:
+                print(f"Failed to upload image of camera {camera_ip} : {e}")
 
+    capture_threads = [threading.Thread(target=capture_stage, args=(camera_ip,), daemon=True) for camera_ip in camera_ips]
+    stages = [threading.Thread(target=encode_stage, daemon=True), threading.Thread(target=upload_stage, daemon=True)]
+    for thread in capture_threads + stages:
+        thread.start()
+    for thread in capture_threads:
+        thread.join()
+    captured.put(None)  # all captures done, stop encoder which then stops uploader
+    for thread in stages:
+        thread.join()
+    return public_urls
+
+#if __name__ == "__main__":
+#    capture_and_upload()
@@ -1,17 +1,19 @@
 import datetime
 from read_SoilSensors import read_soil_by_addr
-from readCameraUpload import capture_and_upload
+from readCameraUpload import capture_and_upload_all
 from read_DHT22 import read_DHT22_by_addr
+from db_connect import batched
 
 print(f"\n ===== {datetime.datetime.now().strftime('%Y%m%d_%H%M%S')} ===== \n")
 
 camera_ip_range = ("192.168.1.205", "192.168.1.206", "192.168.1.207", "192.168.1.208")
 
-read_soil_by_addr(5, 9)
-read_DHT22_by_addr((5, 6, 16, 26))
+# Sensor readings of this tick are committed in one batch
+with batched():
+    read_soil_by_addr(5, 9)
+    read_DHT22_by_addr((5, 6, 16, 26))
 
-for cam_ip in camera_ip_range:
-    try:
-        capture_and_upload(cam_ip)
-    except Exception as e:
-        print(f"Failed to process camera {cam_ip} : {e}")
+try:
+    capture_and_upload_all(camera_ip_range)
+except Exception as e:
+    print(f"Failed to process cameras : {e}")
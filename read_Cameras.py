@@ -1,4 +1,5 @@
 import cv2
+import time
 import datetime
 from lib.Cameras import HIKROBOTCamera
 
@@ -18,6 +19,10 @@ def capture_interval(camera_ip="192.168.1.205", interval_msec=15000):
         next_capture_time = datetime.datetime.now()
 
         while True:
+            # Sleep until the next capture instead of polling the clock
+            wait = (next_capture_time - datetime.datetime.now()).total_seconds()
+            if wait > 0:
+                time.sleep(wait)
             if datetime.datetime.now() >= next_capture_time:
                 image = camera.capture_one()
                 next_capture_time = datetime.datetime.now() + datetime.timedelta(milliseconds=interval_msec)
@@ -1,29 +1,33 @@
-import Adafruit_DHT as dht
+from Adafruit_DHT import DHT22 as _DHT22, read_retry as _read
 import subprocess
-from db_connect import add_new_record
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from db_connect import add_new_record, batched
 from time import sleep
 
+# Host address does not change while running, look it up once instead of forking hostname per call
+try:
+    _IP_ADDR = subprocess.check_output(["hostname", "-I"]).decode("utf-8").strip()
+    _IP_ERROR = None
+except Exception as e:
+    _IP_ADDR = None
+    _IP_ERROR = e
+
+_DEVICE_IDS = (5, 6, 7, 8) if _IP_ADDR == "192.168.1.102" else (1, 2, 3, 4)
+
 def read_DHT22_by_addr(addr_range):
-    try:
-        ip_addr = subprocess.check_output(["hostname", "-I"]).decode("utf-8").strip()
-    except Exception as e:
-        return f"Exception: {str(e)}"
+    if _IP_ERROR is not None:
+        return f"Exception: {str(_IP_ERROR)}"
     
-    h1, t1 = dht.read_retry(dht.DHT22, addr_range[0])
-    h2, t2 = dht.read_retry(dht.DHT22, addr_range[1])
-    h3, t3 = dht.read_retry(dht.DHT22, addr_range[2])
-    h4, t4 = dht.read_retry(dht.DHT22, addr_range[3])
-    
-    results = [{"Temperature" : round(t1, 2), "Humidity" : round(h1, 2)},
-               {"Temperature" : round(t2, 2), "Humidity" : round(h2, 2)},
-               {"Temperature" : round(t3, 2), "Humidity" : round(h3, 2)},
-               {"Temperature" : round(t4, 2), "Humidity" : round(h4, 2)}
-               ]
-
-    if ip_addr == "192.168.1.102":
-        device_id = (5, 6, 7, 8)
-    else:
-        device_id = (1, 2, 3, 4)
+    # Sensors sit on separate GPIO pins, so the blocking reads (~2s each with retries) can overlap
+    with ThreadPoolExecutor(max_workers=len(addr_range)) as executor:
+        readings = list(executor.map(lambda pin: _read(_DHT22, pin), addr_range))
     
-    for dev_id, result in zip(device_id, results):
-        add_new_record("DHT22", dev_id, result)
+    # One (humidity, temperature) row per sensor, rounded together; failed reads (None) become nan
+    values = np.round(np.array(readings, dtype=float), 2)
+    # Records of all sensors are committed together
+    with batched():
+        for dev_id, (h, t) in zip(_DEVICE_IDS, values):
+            if np.isnan(h) or np.isnan(t):  # Sensor did not answer
+                continue
+            add_new_record("DHT22", dev_id, {"Temperature" : float(t), "Humidity" : float(h)})
@@ -4,83 +4,103 @@ import json
 from datetime import datetime
 from lib.SerialDevice import SerialDevice
 from readBytes import get_inst, read_value, get_dev_id
-from db_connect import add_new_record
+from crc import modbus_crc_16
+from db_connect import add_new_record, batched
 
 with open("SoilSensorInstructions.json", "r") as file:
     instructions = json.load(file)
 
+# Register bytes of each instruction, parsed from the hex strings once
+_INST_BYTES = {key: bytes(int(value, 16) for value in inst['bytes'].split())
+               for key, inst in instructions['instructions'].items()}
+
 # Access a specific instruction set
 #inst, inst_type = get_inst()
 
-# CRC Calculations
-def modbus_crc_16(data, endian="big"):
-    """Checksum based on Modbus CRC-16 coding.
-
-    Parameters
-    ----------
-    data : bytearray
-        data to calculate checksum
-    endian : str, optional
-        system endian, by default "big"
-
-    Returns
-    -------
-    first, second : bytes, bytes
-        checksum data in two bytes
-    """    
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos 
-        for i in range(8):
-            if ((crc & 1) != 0):
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    if endian == "little":
-        return crc >> 8, crc & 0xff
-    elif endian == "big":
-        return crc & 0xff, crc >> 8
+# Windows testing, else Raspberry Pi
+_PORT_NAME = 'COM7' if platform.system() == "Windows" else '/dev/ttyUSB0'
 
-def read_soil_by_addr(start_addr=1, end_addr=12):
-    # Windows testing, else Raspberry Pi
-    if platform.system() == "Windows":
-        port_name = 'COM7'
-    else:
-        port_name = '/dev/ttyUSB0'
+# Modbus RTU only needs a 3.5 character silent interval between frames (~4 ms at 9600 baud).
+# The sensors' reply latency is not specified, so _RESPONSE_TIMEOUT is kept generous: it matches the 1s
+# the sensors were given per request before, and a read returns as soon as the full reply arrived,
+# so it only costs time when a sensor does not answer. A missing or corrupt reply is requested again
+_FRAME_GAP = 0.005
+_RESPONSE_TIMEOUT = 1.0
+_RETRIES = 2
+
+def _build_frame(addr, key):
+    a = bytearray([addr, 0x03])
+    a.extend(_INST_BYTES.get(key, b""))
+    a.extend(modbus_crc_16(a))
+    return bytes(a)
+
+# Complete request frames (address, function code, registers, CRC) per address and parameter,
+# built at import for all bus addresses, other addresses on first use
+_FRAMES = {(addr, key): _build_frame(addr, key) for addr in range(1, 13) for key in map(str, range(1, 6))}
+
+def request_frame(addr, key):
+    frame = _FRAMES.get((addr, key))
+    if frame is None:
+        frame = _FRAMES[(addr, key)] = _build_frame(addr, key)
+    return frame
+
+# Response frame is address, function code, byte count, data, CRC; True if complete and the CRC matches
+def valid_frame(frame):
+    if len(frame) < 5 or len(frame) < 5 + frame[2]:
+        return False
+    end = 3 + frame[2]
+    return modbus_crc_16(frame[:end]) == (frame[end], frame[end + 1])
 
+# Reply length of a read request: address, function code, byte count, 2 bytes per register, CRC
+def response_size(key):
+    registers = _INST_BYTES[key][3]
+    return 5 + 2 * registers
+
+# True if the sensor at addr answers a read request with a valid frame
+def probe_soil(serial_device, addr, key='2'):
+    serial_device.write(request_frame(addr, key))
+    data = serial_device.read(size=response_size(key))
+    return bool(data) and valid_frame(data) and data[0] == addr
+
+# Reads every parameter of one sensor, (device id, values) with empty values if it never answered
+def poll_one(serial_device, addr, keys=tuple(map(str, range(1, 6)))):
+    device_id = None
+    collected_data = {}
+    for key in keys:
+        frame = request_frame(addr, key)
+        size = response_size(key)
+        for attempt in range(_RETRIES + 1):
+            serial_device.write(frame)
+
+            data = serial_device.read(size=size, force_timeout=_RESPONSE_TIMEOUT)
+            time.sleep(_FRAME_GAP)  # Silent interval before the next request
+            if data and valid_frame(data):
+                device_id = get_dev_id(data)
+                collected_data.update(read_value(data, key))
+                break
+    return device_id, collected_data
+
+def read_soil_by_addr(start_addr=1, end_addr=12):
     # Initialize the serial device
-    serial_device = SerialDevice.init_port(port_name=port_name, baudRate=9600, timeOut=2, verbose=False)
+    serial_device = SerialDevice.init_port(port_name=_PORT_NAME, baudRate=9600, timeOut=2, verbose=False)
 
+    # Records of the whole sweep are committed together once all addresses are read
+    rows = []
     try:
         for i in range(start_addr, end_addr+1):
-            collected_data = {}
-            for key in map(str, range(1, 6)):
-                a = [i, 0x03]
-                if key in instructions['instructions']:
-                    byte_inst = [int(value, 16) for value in instructions['instructions'][str(key)]['bytes'].split()]
-                    a = bytearray(a)
-                    a.extend(byte_inst)
-                trig_hex = bytearray(a)
-
-                ##calculate checksum and append data to be sent
-                crc = modbus_crc_16(trig_hex)
-                a = trig_hex + bytearray(crc)
-                serial_device.write(a)
-
-                data = serial_device.read(size=13)
-                if data:
-                    device_id = get_dev_id(data.hex())
-                    true_val = read_value(data.hex(), key)
-                    collected_data.update(true_val)
-                                                                        
-                time.sleep(1)  # Delay to avoid flooding the device
+            device_id, collected_data = poll_one(serial_device, i)
             
             #print("Device ID:", device_id)
             #print(f"Received Data: {collected_data}")
-            add_new_record("Soil", device_id, collected_data)
+            if collected_data:  # Skip addresses where no sensor answered
+                rows.append((device_id, collected_data))
             
     except KeyboardInterrupt:
         # Ctrl+C Exit
         print("Terminating the connection.")
         serial_device.disconnect()
+
+    finally:
+        with batched():
+            for device_id, collected_data in rows:
+                add_new_record("Soil", device_id, collected_data)
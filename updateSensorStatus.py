@@ -1,15 +1,10 @@
-import Adafruit_DHT as dht
-from google.cloud import firestore
-from google.oauth2 import service_account
+from Adafruit_DHT import DHT22 as _DHT22, read_retry as _read
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from lib.SerialDevice import SerialDevice
 from lib.Cameras import HIKROBOTCamera
-
-# Credentials JSON key file
-cred = service_account.Credentials.from_service_account_file('db/hortilite-test-firebase-adminsdk-w9s0u-6fdaaf3ee5.json')
-
-# Database init
-db = firestore.Client(credentials=cred)
+from db_client import db
+from read_SoilSensors import probe_soil
 
 # Addresses
 camera_ip_range = ("192.168.1.205", "192.168.1.206", "192.168.1.207", "192.168.1.208")
@@ -17,48 +12,97 @@ soil_id = ("05", "06", "07", "08")
 dht_id = (5, 6, 16, 26)
 dht_device_id = (5, 6, 7, 8)
 
+# Status updates are committed together in one WriteBatch, shared by all checks in run_status_check.
+# Written with set(merge=True), a missing status document is created instead of failing the whole batch
+def commitBatch(batch):
+    try:
+        batch.commit()
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
 # Soil Sensors #
-def checkSoilStatus(sensor_ids):
+# One port is opened for all sensors, each is active if it answers a Modbus read
+def checkSoilStatus(sensor_ids, batch=None):
+    commit = batch is None
+    if commit:
+        batch = db.batch()
+    serial_device = None
+    try:
+        serial_device = SerialDevice.init_port(port_name="/dev/ttyUSB0", baudRate=9600, timeOut=2, verbose=False)
+    except Exception as e:
+        print(f"An error occurred: {e}")
     for sensor_id in sensor_ids:
         try:
-            serial_device = SerialDevice.init_port(port_name="/dev/ttyUSB0", baudRate=9600, timeOut=2, verbose=False)
+            active = serial_device is not None and probe_soil(serial_device, int(sensor_id, 16))
             active_ref = db.collection("Soil").document("soil_" + str(sensor_id))
-            if serial_device:
-                active_ref.update({'active': True})
-            else:
-                active_ref.update({'active': False})
+            batch.set(active_ref, {'active': active}, merge=True)
         except Exception as e:
             print(f"An error occurred: {e}")
+    if serial_device is not None:
+        serial_device.disconnect()
+    if commit:
+        commitBatch(batch)
 
 # DHT22 Sensors #
-def checkDHTStatus(addr_range):
-    for dev_id, gpio_id in zip(dht_device_id, addr_range):
-        active_ref = db.collection("DHT22").document("dht22_" + str(dev_id))
-        for i in range(1, 4):
-            h, t = dht.read_retry(dht.DHT22, gpio_id)
-            if h is None and t is None:
-                active_ref.update({'active': False})
-            else:
-                active_ref.update({'active': True})
-                break
+def probeDHT(gpio_id, attempts=3):
+    for i in range(attempts):
+        h, t = _read(_DHT22, gpio_id)
+        if not (h is None and t is None):
+            return True
+    return False
+
+# Sensors sit on separate GPIO pins, so they are probed concurrently
+def checkDHTStatus(addr_range, batch=None):
+    commit = batch is None
+    if commit:
+        batch = db.batch()
+    with ThreadPoolExecutor(max_workers=len(addr_range)) as executor:
+        for dev_id, active in zip(dht_device_id, executor.map(probeDHT, addr_range)):
+            active_ref = db.collection("DHT22").document("dht22_" + str(dev_id))
+            batch.set(active_ref, {'active': active}, merge=True)
+    if commit:
+        commitBatch(batch)
 
 # Camera Sensors #
-def checkCamStatus(ip_addr_range):
+def checkCamStatus(ip_addr_range, batch=None):
+    commit = batch is None
+    if commit:
+        batch = db.batch()
     for cam_ip in ip_addr_range:
         active_ref = db.collection("Camera").document(str(cam_ip))
+        camera = None
         try:
             camera = HIKROBOTCamera(ip_addr=cam_ip, load_settings=True)
             camera.connect()
-            active_ref.update({'active': True})
+            batch.set(active_ref, {'active': camera.connected()}, merge=True)
 
             if not camera.connected():
-                active_ref.update({'active': False})
                 print(f"Failed to connect to the camera: {cam_ip}")
         except Exception as e:
             print(f"Error connecting to camera {cam_ip}: {e}")
+        finally:
+            # Release the SDK handle and the camera's exclusive control connection for the next probe / capture
+            try:
+                if camera is not None and camera.cam is not None:  # also after a failed connect
+                    camera.close()  # stops the stream first if started
+            except Exception as e:
+                print(f"Error releasing camera {cam_ip}: {e}")
+    if commit:
+        commitBatch(batch)
+
+# Runs all checks over the module's Firestore client and commits every status update in one round trip,
+# a long-running process can call this repeatedly without reconnecting or reloading credentials
+def run_status_check():
+    batch = db.batch()
+    # A check that fails keeps the statuses gathered by the others
+    for check, addresses in ((checkSoilStatus, soil_id), (checkDHTStatus, dht_id), (checkCamStatus, camera_ip_range)):
+        try:
+            check(addresses, batch)
+        except Exception as e:
+            print(f"An error occurred in {check.__name__}: {e}")
+    commitBatch(batch)
 
 # Function Calls
-checkSoilStatus(soil_id)
-checkDHTStatus(dht_id)
-checkCamStatus(camera_ip_range)
-print("done")
+if __name__ == "__main__":
+    run_status_check()
+    print("done")